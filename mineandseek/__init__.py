@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -
+# Mine & Seek: Seekers and Runners playing hide-and-seek in Malmo.
+#
+# Importing the package is cheap; Malmo, the simulator and Tk are only
+# loaded once a mission is started (see mission.main).
@@ -0,0 +1,3 @@
+from .mission import main
+
+main()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -
+
+import random
+import threading
+import time
+import numpy as np
+from .arena import calcYawTo, distance
+from .belief import BeliefEngine
+from .commands import CommandChannel
+
+def normalize(v):
+    # L1-normalizes the rows of v, leaving all-zero rows alone.
+    v = np.asarray(v, dtype = float)
+    total = np.abs(v).sum(axis = -1, keepdims = True)
+
+    return v / np.where(total > 0, total, 1)
+
+class HiddenMarkovModel:
+    # Beliefs one side shares about where each member of the other side is.
+    def __init__(self, f0, T, opponents = 1):
+        self.beliefs = BeliefEngine(T, agents = opponents, f0 = np.asarray(f0).ravel())
+
+        # Ticks may run on a timer thread while agents read the beliefs.
+        self.lock = threading.Lock()
+
+    @property
+    def f(self):
+        return self.beliefs.f[0]
+
+    def get(self):
+        # Probability that some opponent is at each node, as a (1 x nodes) row.
+        with self.lock:
+            f = self.beliefs.f[0]
+
+            if len(f) == 1:
+                return f.copy()
+
+            return 1 - np.prod(1 - f, axis = 0, keepdims = True)
+
+    def get_each(self):
+        # Belief about each opponent, as an (opponents x nodes) copy.
+        with self.lock:
+            return self.beliefs.f[0].copy()
+
+    def tick(self, O, dt = None):
+        with self.lock:
+            return self.beliefs.tick(O, dt)[0]
+
+class Team:
+    # One side of the game. Its members share one HMM, with a belief per
+    # opponent, and fuse what each of them sees into a single update.
+    def __init__(self, arena, members, opponents):
+        self.arena = arena
+        self.members = members
+        self.opponents = opponents
+        self.hmm = HiddenMarkovModel([1 / arena.num_nodes] * arena.num_nodes,
+            arena.transition(), len(opponents))
+
+        for member in members:
+            member.team = self
+            member.hmm = self.hmm
+
+    def tick(self, dt):
+        seen = np.array([[opponent.name in member.seeing for opponent in self.opponents]
+            for member in self.members], dtype = bool)
+
+        O = self.arena.observations.fused(seen, [member.node for member in self.members],
+            [opponent.pos for opponent in self.opponents])
+
+        self.hmm.tick(O, dt)
+
+class Agent:
+    def __init__(self, agent_host, name, arena, starting_pos = '0', clock = time.time):
+        self.agent_host = agent_host
+        self.commands = CommandChannel(agent_host, clock = clock)
+        self.name = name
+        self.arena = arena
+
+        self.current = starting_pos
+        self.going_to = starting_pos
+
+        self.speed = 1
+        self.nearest = None
+        self.action = (0.0, 0.0)     # Last move and turn sent.
+        self.seeing = set()
+        self.pos = (float("inf"), float("inf"), float("inf"))
+
+        self.team = None
+        self.hmm = None
+        self.planner = None
+
+    def update(self, record, seeing):
+        # record is the agent's row of an ObservationDecoder's record.
+        self.pitch, self.yaw, x, y, z, self.life = record.item()[:6]
+        self.pos = (x, y, z)
+        self.nearest = self.arena.graph.nearest(x, z)
+        self.seeing = seeing
+
+    @property
+    def node(self):
+        # Id of the waypoint nearest to the agent, or of the one it last
+        # reached while it has no position yet.
+        return self.arena.index[self.current] if self.nearest is None else self.nearest
+
+    def do(self, command):
+        self.commands.send(command)
+
+    def go_to(self, node):
+        self.going_to = node
+
+    def get_next(self, avoid = []):
+        return random.choice(list(self.arena.edges[self.going_to]))
+
+    def loop(self):
+        vg = self.arena.vg
+
+        # Changes held back by the rate limit go out as soon as they may:
+        self.commands.flush()
+
+        if self.pitch < 0:
+            self.do("pitch 0")
+
+        yaw_to_next = calcYawTo(*vg[self.going_to], *self.pos)
+
+        # Find shortest angular distance between the two yaws, preserving sign:
+        deltaYaw = yaw_to_next - self.yaw
+
+        while deltaYaw < -180: deltaYaw += 360;
+        while deltaYaw > 180: deltaYaw -= 360;
+
+        deltaYaw /= 180.0;
+
+        # And turn:
+        self.do("turn " + str(deltaYaw))
+
+        dist = distance(*self.pos, *vg[self.going_to])
+
+        if dist > 1.8:
+            self.do("move %g" % self.speed)
+            self.action = (self.speed, deltaYaw)
+        else:
+            self.do("move 0")
+            self.action = (0.0, deltaYaw)
+
+            self.current, self.going_to = self.going_to, self.choose()
+
+    def plan(self, avoid = []):
+        # The planner's choice, if there is a planner and it has one.
+        if self.planner is None:
+            return None
+
+        return self.planner.choose(self.going_to, self.hmm.get_each(), avoid)
+
+    def pick(self, utility, avoid = []):
+        # Samples the next waypoint among the neighbors of going_to (and
+        # going_to itself), weighted by utility.
+        graph = self.arena.graph
+
+        allowed = graph.moves(graph.index[self.going_to])
+        allowed[[graph.index[node] for node in avoid]] = False
+
+        utility = normalize(np.where(allowed, np.asarray(utility).ravel(), 0))
+
+        return graph.vgi[np.random.choice(graph.num_nodes, p = utility)]
+
+class Seeker(Agent):
+    def choose(self, avoid = []):
+        planned = self.plan(avoid)
+        if planned is not None:
+            return planned
+
+        agent_is_there = self.hmm.get()
+        guard_goal = self.arena.dist_to_obj
+
+        utility = 0.9 * agent_is_there + 0.1 * guard_goal
+
+        return self.pick(utility, avoid)
+
+class Runner(Agent):
+    def choose(self, avoid = []):
+        planned = self.plan(avoid)
+        if planned is not None:
+            return planned
+
+        agent_is_there = 1 - self.hmm.get()
+        chase_goal = 1 - self.arena.dist_to_obj
+
+        utility = 0.9 * agent_is_there + 0.1 * chase_goal
+
+        return self.pick(utility, avoid)
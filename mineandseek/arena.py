@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -
+
+# The arena: the mission XML and what the agents derive from its drawing
+# (waypoints, edges, sight lines, observation tables, transition model).
+
+import math
+import numpy as np
+from .belief import SparseTransition, TransitionOperator, loadTransition
+from .graph import Graph
+from .mapcompiler import CACHE_DIR, compileMap
+from .observation import ObservationModel
+from .sight import LineOfSight
+
+# Graphs with more waypoints than this use sparse belief propagation:
+SPARSE_NODES = 256
+
+def agentNames(role, count):
+    # The first agent of each side keeps the plain name.
+    return [role] + [role + str(i) for i in range(2, count + 1)] if count > 0 else []
+
+def seekerNames(count):
+    return agentNames('Seeker', count)
+
+def runnerNames(count):
+    return agentNames('Runner', count)
+
+def seekerXML(name, x = 15.5, z = 1.5, entity_range = 40):
+    return '''              <AgentSection mode="Survival">
+                <Name>''' + name + '''</Name>
+                <AgentStart>
+                  <Placement x="''' + str(x) + '''" y="5.0" z="''' + str(z) + '''" yaw="0"/>
+                  <Inventory>
+                    <InventoryItem slot="0" type="diamond_sword"/>
+                    <InventoryItem slot="38" type="diamond_chestplate"/>
+                    <InventoryItem slot="37" type="diamond_leggings"/>
+                    <InventoryItem slot="36" type="diamond_boots"/>
+                  </Inventory>
+                </AgentStart>
+                <AgentHandlers>
+                  <ObservationFromFullStats/>
+                  <ObservationFromNearbyEntities>
+                    <Range name="entities" xrange="''' + str(entity_range) + '''" yrange="2" zrange="''' + str(entity_range) + '''"/>
+                  </ObservationFromNearbyEntities>
+                  <RewardForCollectingItem>
+                    <Item type="diamond" reward="50"/>
+                  </RewardForCollectingItem>
+                  <AgentQuitFromCollectingItem>
+                    <Item type="diamond" description="CATCH" />
+                  </AgentQuitFromCollectingItem>
+                  <ContinuousMovementCommands turnSpeedDegs="840"/>
+                  <InventoryCommands/>
+                  <MissionQuitCommands/>
+                </AgentHandlers>
+              </AgentSection>
+'''
+
+def runnerXML(name, x, y, z, entity_range = 40):
+    return '''              <AgentSection mode="Survival">
+                <Name>''' + name + '''</Name>
+                <AgentStart>
+                  <Placement x="''' + str(x) + '''" y="5.0" z="''' + str(z) + '''" yaw="0"/>
+                    <Inventory>
+                        <InventoryItem slot="0" type="diamond"/>
+                    </Inventory>
+                </AgentStart>
+                <AgentHandlers>
+                  <ObservationFromFullStats/>
+                  <ObservationFromNearbyEntities>
+                    <Range name="entities" xrange="''' + str(entity_range) + '''" yrange="2" zrange="''' + str(entity_range) + '''"/>
+                  </ObservationFromNearbyEntities>
+                  <RewardForDiscardingItem>
+                    <Item type="diamond" reward="-50"/>
+                  </RewardForDiscardingItem>
+                  <ContinuousMovementCommands turnSpeedDegs="840"/>
+                  <InventoryCommands/>
+                  <MissionQuitCommands/>
+                </AgentHandlers>
+              </AgentSection>
+'''
+
+# The hand-drawn arena: a 30 x 40 brick enclosure with the diamond block at
+# the middle of its near wall. mineandseek.generator makes others like it.
+DRAWING = '''                  <DrawingDecorator>
+                    <!-- Outer wall -->
+                    <DrawCuboid x1="0" y1="4" z1="0" x2="30" y2="6" z2="40" type="brick_block"/>
+                    <DrawCuboid x1="1" y1="4" z1="1" x2="29" y2="7" z2="39" type="air"/>
+
+                    <!-- Observer spot -->
+                    <DrawCuboid x1="0" y1="25" z1="0" x2="30" y2="25" z2="40" type="barrier"/>
+                    <DrawBlock x="15" y="25" z="20" type="air"/>
+
+                    <!-- 1 -->
+                    <DrawCuboid x1="10" y1="4" z1="10" x2="20" y2="6" z2="15" type="brick_block"/>
+                    <DrawCuboid x1="13" y1="4" z1="13" x2="17" y2="6" z2="15" type="air"/>
+
+                    <!-- 2 -->
+                    <DrawCuboid x1="1" y1="4" z1="10" x2="5" y2="6" z2="15" type="brick_block"/>
+                    <DrawLine x1="5" y1="4" z1="15" x2="1" y2="4" z2="19" type="brick_block"/>
+                    <DrawLine x1="5" y1="5" z1="15" x2="1" y2="5" z2="19" type="brick_block"/>
+                    <DrawLine x1="5" y1="6" z1="15" x2="1" y2="6" z2="19" type="brick_block"/>
+                    <DrawBlock x="1" y="6" z="16" type="brick_block"/>
+                    <DrawBlock x="2" y="6" z="16" type="brick_block"/>
+                    <DrawBlock x="1" y="6" z="17" type="brick_block"/>
+
+                    <!-- 3 -->
+                    <DrawCuboid x1="29" y1="4" z1="10" x2="25" y2="6" z2="15" type="brick_block"/>
+                    <DrawLine x1="25" y1="4" z1="15" x2="29" y2="4" z2="19" type="brick_block"/>
+                    <DrawLine x1="25" y1="5" z1="15" x2="29" y2="5" z2="19" type="brick_block"/>
+                    <DrawLine x1="25" y1="6" z1="15" x2="29" y2="6" z2="19" type="brick_block"/>
+                    <DrawBlock x="29" y="6" z="16" type="brick_block"/>
+                    <DrawBlock x="28" y="6" z="16" type="brick_block"/>
+                    <DrawBlock x="29" y="6" z="17" type="brick_block"/>
+
+                    <!-- 4 -->
+                    <DrawCuboid x1="20" y1="4" z1="20" x2="18" y2="6" z2="35" type="brick_block"/>
+                    <DrawLine x1="20" y1="4" z1="20" x2="25" y2="4" z2="25" type="brick_block"/>
+                    <DrawLine x1="20" y1="5" z1="20" x2="25" y2="5" z2="25" type="brick_block"/>
+                    <DrawLine x1="20" y1="6" z1="20" x2="25" y2="6" z2="25" type="brick_block"/>
+                    <DrawLine x1="25" y1="4" z1="25" x2="20" y2="4" z2="25" type="brick_block"/>
+                    <DrawLine x1="25" y1="5" z1="25" x2="20" y2="5" z2="25" type="brick_block"/>
+                    <DrawLine x1="25" y1="6" z1="25" x2="20" y2="6" z2="25" type="brick_block"/>
+                    <DrawLine x1="25" y1="6" z1="24" x2="20" y2="6" z2="24" type="brick_block"/>
+                    <DrawLine x1="24" y1="6" z1="23" x2="20" y2="6" z2="23" type="brick_block"/>
+                    <DrawBlock x="21" y="6" z="22" type="brick_block"/>
+
+                    <!-- 5 -->
+                    <DrawCuboid x1="10" y1="4" z1="20" x2="12" y2="6" z2="30" type="brick_block"/>
+                    <DrawLine x1="10" y1="4" z1="20" x2="5" y2="4" z2="25" type="brick_block"/>
+                    <DrawLine x1="10" y1="5" z1="20" x2="5" y2="5" z2="25" type="brick_block"/>
+                    <DrawLine x1="10" y1="6" z1="20" x2="5" y2="6" z2="25" type="brick_block"/>
+                    <DrawLine x1="5" y1="4" z1="25" x2="10" y2="4" z2="25" type="brick_block"/>
+                    <DrawLine x1="5" y1="5" z1="25" x2="10" y2="5" z2="25" type="brick_block"/>
+                    <DrawLine x1="5" y1="6" z1="25" x2="10" y2="6" z2="25" type="brick_block"/>
+                    <DrawLine x1="5" y1="6" z1="24" x2="10" y2="6" z2="24" type="brick_block"/>
+                    <DrawLine x1="6" y1="6" z1="23" x2="10" y2="6" z2="23" type="brick_block"/>
+                    <DrawBlock x="9" y="6" z="22" type="brick_block"/>
+
+                    <!-- 6 -->
+                    <DrawCuboid x1="29" y1="4" z1="30" x2="25" y2="6" z2="35" type="brick_block"/>
+
+                    <!-- 7 -->
+                    <DrawCuboid x1="13" y1="4" z1="35" x2="13" y2="6" z2="40" type="brick_block"/>
+                    <DrawCuboid x1="13" y1="4" z1="35" x2="5" y2="6" z2="35" type="brick_block"/>
+                    <DrawCuboid x1="5" y1="4" z1="30" x2="1" y2="6" z2="30" type="brick_block"/>
+
+                    <DrawBlock x="15" y="3" z="1" type="diamond_block"/>
+
+                    <!-- A --> <DrawBlock x="22" y="3" z="8" type="gold_block"/>
+                    <!-- B --> <DrawBlock x="8" y="3" z="8" type="gold_block"/>
+                    <!-- C --> <DrawBlock x="15" y="3" z="13" type="gold_block"/>
+                    <!-- D --> <DrawBlock x="23" y="3" z="18" type="gold_block"/>
+                    <!-- E --> <DrawBlock x="15" y="3" z="18" type="gold_block"/>
+                    <!-- F --> <DrawBlock x="7" y="3" z="18" type="gold_block"/>
+                    <!-- G --> <DrawBlock x="28" y="3" z="25" type="gold_block"/>
+                    <!-- H --> <DrawBlock x="2" y="3" z="25" type="gold_block"/>
+                    <!-- I --> <DrawBlock x="23" y="3" z="28" type="gold_block"/>
+                    <!-- J --> <DrawBlock x="7" y="3" z="28" type="gold_block"/>
+                    <!-- K --> <DrawBlock x="15" y="3" z="32" type="gold_block"/>
+                    <!-- L --> <DrawBlock x="7" y="3" z="32" type="gold_block"/>
+                    <!-- M --> <DrawBlock x="2" y="3" z="35" type="gold_block"/>
+                    <!-- N --> <DrawBlock x="28" y="3" z="38" type="gold_block"/>
+                    <!-- O --> <DrawBlock x="23" y="3" z="38" type="gold_block"/>
+                    <!-- P --> <DrawBlock x="18" y="3" z="38" type="gold_block"/>
+                    <!-- Q --> <DrawBlock x="8" y="3" z="38" type="gold_block"/>
+                  </DrawingDecorator>
+'''
+
+def getXML(runners, num_seekers = 1, force_reset = True, keep_world = False, ms_per_tick = 50,
+        drawing = DRAWING, start = (15.5, 1.5), entity_range = 40):
+    # runners holds the start position of each Runner; Seekers all start at
+    # start, the (x, z) of the diamond block in drawing. A world kept after
+    # the mission can be reused by the next one with force_reset off, which
+    # saves regenerating it. Fewer ms_per_tick than 50 run the game faster
+    # than real time. Agents are told about the others within entity_range
+    # blocks (on the same level), which is as far as they can spot them.
+    agents = ''.join(seekerXML(name, *start, entity_range) for name in seekerNames(num_seekers)) + \
+        ''.join(runnerXML(name, *pos, entity_range) for name, pos in zip(runnerNames(len(runners)), runners))
+
+    xml = '''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+            <Mission xmlns="http://ProjectMalmo.microsoft.com" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+            
+              <About>
+                <Summary>Simple chasing agent</Summary>
+              </About>
+
+              <ModSettings>
+                <MsPerTick>''' + str(int(ms_per_tick)) + '''</MsPerTick>
+              </ModSettings>
+              
+              <ServerSection>
+                <ServerInitialConditions>
+                  <Time>
+                    <StartTime>12000</StartTime>
+                    <AllowPassageOfTime>false</AllowPassageOfTime>
+                  </Time>
+                  <Weather>clear</Weather>
+                </ServerInitialConditions>
+                <ServerHandlers>
+                  <FlatWorldGenerator destroyAfterUse="''' + str(not keep_world).lower() + '''" forceReset="''' + str(force_reset).lower() + '''"/>
+''' + drawing + '''                  <!--ServerQuitFromTimeUp description="DIDNT_CATCH" timeLimitMs="30000"/-->
+                  <ServerQuitWhenAnyAgentFinishes/>
+                </ServerHandlers>
+              </ServerSection>
+              
+              <!--AgentSection mode="Creative">
+                <Name>Observer</Name>
+                <AgentStart>
+                  <Placement x="15.5" y="26" z="20" yaw="90" pitch="90"/>
+                </AgentStart>
+                <AgentHandlers>
+                  <ObservationFromFullStats/>
+                  <AbsoluteMovementCommands/>
+                  <MissionQuitCommands/>
+                  <VideoProducer>
+                    <Width>896</Width>
+                    <Height>640</Height>
+                  </VideoProducer>
+                </AgentHandlers>
+              </AgentSection-->
+
+''' + agents + '''
+            </Mission>'''
+
+    return xml
+
+def calcYawTo(fx, fy, fz, x, y, z):
+    dx = fx - x
+    dz = fz - z
+
+    return -180 * math.atan2(dx, dz) / math.pi
+
+def distance(x1, y1, z1, x2, y2, z2):
+    return abs(x1 - x2) + abs(z1 - z2)
+
+def walkingEntries(graph):
+    # (rows, cols, values) of the transition matrix of a Graph with each edge
+    # taken at walking speed over its length; a node keeps what its edges do
+    # not take on average. Built straight from the edges, so it costs O(edges).
+    num_nodes = graph.num_nodes
+    rows, cols = graph.edge_list.T
+
+    positions = graph.positions
+    rates = (4.3 / np.abs(positions[rows] - positions[cols])[:, [0, 2]].sum(axis = 1)).clip(0, 1)
+
+    degree = np.maximum(np.bincount(rows, minlength = num_nodes), 1)
+    stay = 1 - np.bincount(rows, rates, minlength = num_nodes) / degree
+    total = np.bincount(rows, rates, minlength = num_nodes) + stay
+
+    return (np.concatenate([rows, np.arange(num_nodes)]),
+        np.concatenate([cols, np.arange(num_nodes)]),
+        np.concatenate([rates / total[rows], stay / total]))
+
+class Arena:
+    # Waypoints, walkable edges and lines of sight come from the arena's
+    # drawing; the agents passed to getXML do not change it. A layout made
+    # by mineandseek.generator replaces the hand-drawn arena, and the tables
+    # banked with it save building them again.
+    def __init__(self, xml = None, cache_dir = CACHE_DIR, transition_file = None, layout = None):
+        if layout is not None:
+            self.map = layout.map
+            self.drawing, self.start, self.size = layout.drawing, layout.start, layout.size
+        else:
+            self.map = compileMap(getXML([]) if xml is None else xml, cache_dir)
+            self.drawing, self.start, self.size = DRAWING, (15.5, 1.5), (30, 40)
+
+        self.vgi = self.map.vgi
+        self.vg = self.map.vg
+        self.edges = self.map.edges
+        self.can_see = self.map.can_see
+        self.num_nodes = len(self.vgi)
+        self.graph = Graph(self.vgi, self.vg, self.edges, grid = layout.grid() if layout is not None else None)
+        self.index = self.graph.index
+
+        # Where Runners may start: away from the diamond block.
+        self.starts = layout.starts if layout is not None else self.vgi[11:]
+
+        self.sight = LineOfSight(self.map.occupancy, self.map.origin)
+
+        self.dist_to_obj = np.array([distance(*self.vg[node], *self.vg['0']) for node in self.vgi])
+        self.dist_to_obj /= sum(self.dist_to_obj)
+
+        self.observations = ObservationModel(self.graph, self.size)
+
+        # A transition model fitted by mineandseek.fitting, if any, and the
+        # seconds one of its steps stands for:
+        self.transition_file = transition_file
+        self.period = loadTransition(transition_file, self.vgi)[3] if transition_file else 0.1
+        self._transition = None
+
+    def spotted(self, pos, entities, names):
+        # Which of the entities called names an agent at pos can see, from
+        # the (name, x, y, z) of the nearby entities it reported and the
+        # walls in between.
+        if not (math.isfinite(pos[0]) and math.isfinite(pos[2])):
+            return set()
+
+        return set(name for name, x, y, z in entities
+            if name in names and self.sight.visible(pos, (x, y, z)))
+
+    def transitionEntries(self):
+        # (rows, cols, values) of the transition matrix, self-loops included:
+        # the fitted values from transition_file when there is one, and
+        # walkingEntries() otherwise.
+        if self.transition_file:
+            return loadTransition(self.transition_file, self.vgi)[:3]
+
+        return walkingEntries(self.graph)
+
+    def transitionMatrix(self):
+        # Small graphs get a dense copy, which is faster there.
+        T = SparseTransition(*self.transitionEntries(), self.num_nodes, self.period)
+
+        return T.toarray() if self.num_nodes <= SPARSE_NODES else T
+
+    def transition(self):
+        # The operator built from transitionMatrix(), made once and shared by
+        # every HMM on this arena, so later games start with its cache of
+        # steps warm.
+        if self._transition is None:
+            T = self.transitionMatrix()
+            self._transition = T if isinstance(T, SparseTransition) else TransitionOperator(T, self.period)
+
+        return self._transition
+
+    def missionXML(self, runners, num_seekers = 1, force_reset = True, keep_world = False, ms_per_tick = 50,
+            entity_range = 40):
+        # getXML for this arena's drawing.
+        return getXML(runners, num_seekers, force_reset, keep_world, ms_per_tick, self.drawing, self.start,
+            entity_range)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -
+
+# Forward filtering for many HMM beliefs at once. Beliefs are kept in one
+# (games x agents x nodes) array and a tick applies the transition and the
+# (diagonal) observation to all of them with a single matmul and an
+# elementwise product, which is what HiddenMarkovModel.tick does one column
+# vector at a time.
+
+import numpy as np
+from functools import lru_cache
+
+class TransitionOperator:
+    # A transition matrix T that describes one step of `period` seconds,
+    # stretched to any dt the way SparseTransition does it: floor(dt / period)
+    # whole steps and, for what is left, one more step taken with a weight of
+    # the fraction left over. Whole periods are exact powers of T and every
+    # step is a stochastic matrix, but only steps a whole number of periods
+    # apart compose: T ** k and the step of s periods make the step of k + s.
+    # T itself usually has negative eigenvalues, so it has no real fractional
+    # powers and no generator Q with exp(period Q) = T to take them from.
+    # Steps are cached by dt rounded to `resolution` seconds.
+    def __init__(self, T, period = 0.1, resolution = 0.001, cache_size = 256):
+        self.T = np.asarray(T, dtype = float)
+        self.period = period
+        self.resolution = resolution
+        self.nodes = self.T.shape[-1]
+
+        self.matrix = lru_cache(maxsize = cache_size)(self._matrix)
+
+    def __call__(self, dt):
+        return self.matrix(int(round(dt / self.resolution)))
+
+    def propagate(self, f, dt):
+        # Moves the beliefs f, shaped (..., nodes), forward by dt seconds.
+        P = self(dt)
+
+        if P.ndim == 2:
+            return np.matmul(f, P)
+
+        return np.matmul(f[..., np.newaxis, :], P)[..., 0, :]
+
+    def power(self, s):
+        # The step of s >= 0 periods.
+        return _interpolatedPower(self.T, s)
+
+    def _matrix(self, steps):
+        P = self.power(round(steps * self.resolution / self.period, 9))
+        P.setflags(write = False)
+
+        return P
+
+def _interpolatedPower(T, s):
+    # T ** s from the whole powers either side of s, mixed linearly: a walker
+    # that takes floor(s) steps and one more with probability s - floor(s).
+    k = int(np.floor(s))
+    w = s - k
+    P = np.linalg.matrix_power(T, k)
+
+    return P if w == 0 else (1 - w) * P + w * np.matmul(P, T)
+
+class SparseTransition:
+    # Row-stochastic transition matrix in CSR form, for waypoint graphs too
+    # big for dense (nodes x nodes) arrays. Like TransitionOperator it stands
+    # for one step of `period` seconds. A step of dt seconds takes
+    # floor(dt / period) whole steps and, for what is left, mixes in one more
+    # step with a weight of the fraction left over, so that whole multiples of
+    # period are exact powers of T. A step costs a few sparse products whose
+    # size is the edge count.
+    def __init__(self, rows, cols, values, nodes, period = 0.1, resolution = 0.001):
+        rows = np.asarray(rows, dtype = np.intp)
+        cols = np.asarray(cols, dtype = np.intp)
+        values = np.asarray(values, dtype = float)
+
+        order = np.lexsort((cols, rows))
+        self.indices = cols[order]
+        self.data = values[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength = nodes))])
+        self.nodes = nodes
+        self.period = period
+        self.resolution = resolution
+
+        # T stored by column, so that f @ T is one gather, one product and
+        # one segmented sum. Zeros on the diagonal keep every column non-empty.
+        t_rows = np.concatenate([rows, np.arange(nodes)])
+        t_cols = np.concatenate([cols, np.arange(nodes)])
+        t_vals = np.concatenate([values, np.zeros(nodes)])
+
+        order = np.argsort(t_cols, kind = 'stable')
+        self.t_rows = t_rows[order]
+        self.t_vals = t_vals[order]
+        self.t_starts = np.concatenate([[0], np.cumsum(np.bincount(t_cols, minlength = nodes))])[:-1]
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def toarray(self):
+        T = np.zeros((self.nodes, self.nodes))
+        T[np.repeat(np.arange(self.nodes), np.diff(self.indptr)), self.indices] = self.data
+
+        return T
+
+    def step(self, f):
+        # f @ T over the last axis of f.
+        return np.add.reduceat(f[..., self.t_rows] * self.t_vals, self.t_starts, axis = -1)
+
+    def propagate(self, f, dt):
+        s = round(int(round(dt / self.resolution)) * self.resolution / self.period, 9)
+        k = int(np.floor(s))
+        w = s - k
+
+        for x in range(k):
+            f = self.step(f)
+
+        return f if w == 0 else (1 - w) * f + w * self.step(f)
+
+def saveTransition(path, vgi, rows, cols, values, period, **info):
+    # Stores a sparse transition model for the waypoints vgi, with any
+    # extra information about how it was made.
+    np.savez(path, vgi = np.array(vgi), rows = rows, cols = cols, values = values,
+        period = period, **info)
+
+def loadTransition(path, vgi):
+    # (rows, cols, values, period) of a model stored by saveTransition. The
+    # waypoints must be the ones it was made for.
+    with np.load(path) as data:
+        if list(data['vgi']) != list(vgi):
+            raise ValueError('%s was fitted on different waypoints.' % path)
+
+        return data['rows'], data['cols'], data['values'], float(data['period'])
+
+class BeliefEngine:
+    def __init__(self, T, games = 1, agents = 1, f0 = None, period = 0.1):
+        # T is either one (nodes x nodes) row-stochastic matrix shared by
+        # everybody or one per agent, shaped (agents x nodes x nodes), and
+        # describes how beliefs move in `period` seconds. A SparseTransition
+        # or TransitionOperator is used as it is, so engines can share one.
+        if isinstance(T, (SparseTransition, TransitionOperator)):
+            self.transition = T
+        else:
+            self.transition = TransitionOperator(T, period)
+
+        self.T = T
+        self.nodes = self.transition.nodes
+        self.f = np.empty((games, agents, self.nodes))
+
+        self.reset(f0)
+
+    @property
+    def shape(self):
+        return self.f.shape
+
+    def reset(self, f0 = None):
+        if f0 is None:
+            self.f[...] = 1.0 / self.nodes
+        else:
+            self.f[...] = f0
+
+    def get(self):
+        return self.f
+
+    def tick(self, O = None, dt = None):
+        # O holds the diagonal of the observation matrix for every belief and
+        # broadcasts against (games x agents x nodes); None means "no evidence".
+        # dt defaults to one period.
+        f = self.transition.propagate(self.f, self.transition.period if dt is None else dt)
+
+        if O is not None:
+            f *= O
+
+        f /= f.sum(axis = -1, keepdims = True)
+        self.f = f
+
+        return f
@@ -0,0 +1,314 @@
+from __future__ import print_function
+# -*- coding: utf-8 -
+
+# Benchmarks of the hot paths, with no Minecraft needed:
+#
+#   python -m mineandseek.benchmark --out bench.json --update-baseline
+#   python -m mineandseek.benchmark --out bench.json --baseline bench-baseline.json --tolerance 0.25
+#
+# Belief ticks, the transition build, choosing a waypoint, steering,
+# decoding observations and drawing are timed on generated arenas of several
+# sizes and with several opponents, and whole games are played from fixed
+# seeds, one at a time on the simulator and batched in lockstep in BatchEnv.
+# Each result is the median seconds per call over a few rounds. Against a
+# baseline, anything slower than it by more than the tolerance is
+# a regression and makes the run exit with status 1, as does a missing
+# baseline. Baselines belong to the machine they were measured on, so none
+# is kept in the repository; store one with --update-baseline first.
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import platform
+import sys
+import time
+import timeit
+import numpy as np
+from .agents import HiddenMarkovModel, Runner, Seeker
+from .arena import Arena, calcYawTo
+from .clock import TickClock
+from .decoding import RECORD, ObservationDecoder
+from .generator import loadLayout
+
+print = functools.partial(print, flush = True)
+
+SIZES = [(30, 40), (60, 80), (90, 120), (120, 160)]
+OPPONENTS = [1, 2, 4]
+
+class _Host:
+    # Stands in for an AgentHost where nothing needs to be sent anywhere.
+    def sendCommand(self, command):
+        pass
+
+def measure(fn, repeat = 5, min_time = 0.2):
+    # Median and best seconds per call of fn, over repeat rounds of as many
+    # calls as take about min_time / repeat.
+    timer = timeit.Timer(fn)
+    calls = 1
+    while True:
+        if timer.timeit(calls) >= min_time / repeat:
+            break
+        calls *= 2
+
+    rounds = [t / calls for t in timer.repeat(repeat, calls)]
+
+    return {'seconds': float(np.median(rounds)), 'best': float(min(rounds)), 'calls': calls}
+
+def timed(results, name, fn, repeat, min_time, only = ''):
+    # Times fn into results[name], unless only rules the name out.
+    if only in name:
+        results[name] = measure(fn, repeat, min_time)
+
+def arenaNames(label):
+    # Every name arenaBenchmarks and drawBenchmark can report for an arena.
+    return ['transition/' + label, 'seeker.choose/' + label, 'runner.choose/' + label,
+        'agent.loop/' + label, 'draw/' + label] + \
+        ['hmm.tick/%s/opponents=%d' % (label, opponents) for opponents in OPPONENTS]
+
+def _agent(cls, arena, team, pos):
+    agent = cls(_Host(), cls.__name__, arena)
+    agent.hmm = team
+
+    record = np.zeros(1, dtype = RECORD)
+    record[['XPos', 'YPos', 'ZPos', 'Life']] = pos + (20.0,)
+    agent.update(record[0], set())
+
+    return agent
+
+def arenaBenchmarks(arena, label, repeat, min_time, only = ''):
+    results = {}
+    graph = arena.graph
+
+    def rebuild():
+        arena._transition = None
+        arena.transition()
+
+    timed(results, 'transition/' + label, rebuild, repeat, min_time, only)
+
+    for opponents in OPPONENTS:
+        hmm = HiddenMarkovModel([1 / arena.num_nodes] * arena.num_nodes, arena.transition(), opponents)
+        seen = np.zeros((1, opponents), dtype = bool)
+        seen[0, 0] = True
+        positions = [tuple(graph.positions[i % graph.num_nodes]) for i in range(opponents)]
+        O = arena.observations.fused(seen, [0], positions)
+
+        timed(results, 'hmm.tick/%s/opponents=%d' % (label, opponents), lambda: hmm.tick(O, 0.05),
+            repeat, min_time, only)
+
+    hmm = HiddenMarkovModel([1 / arena.num_nodes] * arena.num_nodes, arena.transition())
+    far = arena.vgi[-1]
+    seeker = _agent(Seeker, arena, hmm, arena.vg['0'])
+    runner = _agent(Runner, arena, hmm, arena.vg[far])
+
+    timed(results, 'seeker.choose/' + label, seeker.choose, repeat, min_time, only)
+    timed(results, 'runner.choose/' + label, runner.choose, repeat, min_time, only)
+
+    # Heading for a waypoint it is not close to, so loop() only steers:
+    seeker.going_to = far
+    timed(results, 'agent.loop/' + label, seeker.loop, repeat, min_time, only)
+
+    return results
+
+def drawBenchmark(arena, label, repeat, min_time, only = ''):
+    # One frame of the belief view, if there is a display to draw on.
+    if only not in 'draw/' + label:
+        return {}
+
+    try:
+        import tkinter as tk
+        from .render import GraphView
+        root = tk.Tk()
+    except Exception:
+        return {}
+
+    hmm = HiddenMarkovModel([1 / arena.num_nodes] * arena.num_nodes, arena.transition())
+    view = GraphView(arena.vgi, arena.vg, arena.edges, arena.size)
+    view.root = root
+    view.canvas = tk.Canvas(root, width = arena.size[0] * view.scale, height = arena.size[1] * view.scale)
+    view.seekers = [_agent(Seeker, arena, hmm, arena.vg['0'])]
+    view.runners = [_agent(Runner, arena, hmm, arena.vg[arena.vgi[-1]])]
+    view.create()
+
+    def frame():
+        view.draw()
+        root.update_idletasks()
+
+    try:
+        return {'draw/' + label: measure(frame, repeat, min_time)}
+    finally:
+        root.destroy()
+
+def decodeBenchmark(num_agents, repeat, min_time):
+    # Picking one observation apart, as the simulator words it, with the
+    # other agents in range.
+    from .simulator import TimestampedString, WorldState
+
+    obs = {'DistanceTravelled': 1234, 'TimeAlive': 100, 'MobsKilled': 0, 'PlayersKilled': 0,
+        'DamageTaken': 0, 'DamageDealt': 0, 'Life': 20.0, 'Score': 0, 'Food': 20, 'XP': 0,
+        'IsAlive': True, 'Air': 300, 'Name': 'Seeker', 'XPos': 15.5, 'YPos': 4.0, 'ZPos': 1.5,
+        'Pitch': 0.0, 'Yaw': -12.25, 'WorldTime': 12000, 'TotalTime': 100,
+        'entities': [{'yaw': 0.0, 'x': 3.25, 'y': 4.0, 'z': 5.25, 'pitch': 0.0, 'id': str(i),
+            'motionX': 0.0, 'motionY': 0.0, 'motionZ': 0.0, 'life': 20.0, 'name': 'Runner%d' % i}
+            for i in range(num_agents)]}
+
+    world_state = WorldState(True, True, [TimestampedString(0.0, json.dumps(obs))])
+    decoder = ObservationDecoder(1)
+
+    return {'decode/agents=%d' % num_agents: measure(lambda: decoder.decode(0, world_state), repeat, min_time)}
+
+def envBenchmark(arena, games, repeat, min_time):
+    # One step of the batched environment with its batched policies, all
+    # games playing.
+    from .env import BatchEnv
+    from .policies import BatchRunner, BatchSeeker
+
+    env = BatchEnv(arena, games, max_steps = 1 << 30)
+    seekers, runners = BatchSeeker(env), BatchRunner(env)
+    state = {'obs': env.reset(range(games))}
+
+    def step():
+        obs = state['obs']
+        if obs['done'].any():
+            obs = env.reset(mask = obs['done'])
+        state['obs'] = env.step(np.concatenate([seekers.act(obs), runners.act(obs)], axis = 1))[0]
+
+    result = measure(step, repeat, min_time)
+    result['game_steps_per_second'] = games / result['seconds']
+
+    return {'env.step/games=%d' % games: result}
+
+def episodeBenchmark(seeds, num_agents = 2, layout = None):
+    # Wall time of whole lockstep games on the simulator, one per seed.
+    from . import mission
+
+    MalmoPython = mission.loadBackend(True)
+    MalmoPython.setRealTime(False)
+
+    agent_hosts = [MalmoPython.AgentHost() for x in range(num_agents)]
+    client_pool = MalmoPython.ClientPool()
+    for x in range(10000, 10000 + num_agents):
+        client_pool.add(MalmoPython.ClientInfo('127.0.0.1', x))
+
+    arena = Arena(layout = layout)
+    seconds = []
+    ticks = 0
+
+    # The mission helpers report every start; none of that is wanted here:
+    with contextlib.redirect_stdout(io.StringIO()):
+        for seed in seeds:
+            start = time.perf_counter()
+            result = mission.runEpisode(agent_hosts, client_pool, arena, 1, TickClock(),
+                poll_interval = 0, settle_time = 0, keep_world = True, seed = seed)
+            seconds.append(time.perf_counter() - start)
+            ticks += int(round(result['duration'] / 0.05))
+
+    return {'seconds': float(np.median(seconds)), 'best': float(min(seconds)), 'calls': len(seeds),
+        'game_ticks_per_second': ticks / sum(seconds)}
+
+def run(sizes = SIZES, repeat = 5, min_time = 0.2, episodes = 5, only = ''):
+    # Every benchmark whose name contains only; the others are not set up,
+    # let alone timed.
+    results = {}
+
+    for size in sizes:
+        layout = loadLayout(0, size)
+        label = 'nodes=%d' % len(layout.map.vgi)
+        if not any(only in name for name in arenaNames(label)):
+            continue
+
+        arena = Arena(layout = layout)
+        results.update(arenaBenchmarks(arena, label, repeat, min_time, only))
+        results.update(drawBenchmark(arena, label, repeat, min_time, only))
+
+    timed(results, 'calcYawTo', lambda: calcYawTo(1.5, 4.0, 2.5, 10.2, 4.0, 7.7), repeat, min_time, only)
+
+    for num_agents in (2, 8):
+        if only in 'decode/agents=%d' % num_agents:
+            results.update(decodeBenchmark(num_agents, repeat, min_time))
+
+    for games in (1, 256):
+        if only in 'env.step/games=%d' % games:
+            results.update(envBenchmark(Arena(), games, repeat, min_time))
+
+    if episodes:
+        layout = loadLayout(0, sizes[0])
+        name = 'episode/nodes=%d/agents=4' % len(layout.map.vgi)
+
+        if only in 'episode/hand-drawn':
+            results['episode/hand-drawn'] = episodeBenchmark(range(episodes))
+        if only in name:
+            results[name] = episodeBenchmark(range(episodes), 4, layout)
+
+    return results
+
+def compare(results, baseline, tolerance):
+    # The benchmarks slower than baseline by more than tolerance, as
+    # (name, baseline seconds, seconds).
+    regressions = []
+
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+
+        before, after = baseline[name]['seconds'], result['seconds']
+        if after > before * (1 + tolerance):
+            regressions.append((name, before, after))
+
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Time the hot paths and whole simulated games.')
+    parser.add_argument('--out', default = 'bench.json', help = 'Write the results to this JSON file.')
+    parser.add_argument('--baseline', default = 'bench-baseline.json', help = 'Results to compare against.')
+    parser.add_argument('--update-baseline', action = 'store_true', help = 'Store these results as the baseline.')
+    parser.add_argument('--tolerance', type = float, default = 0.25,
+        help = 'How much slower than the baseline a benchmark may be, as a fraction.')
+    parser.add_argument('--repeat', type = int, default = 5, help = 'Timed rounds per benchmark.')
+    parser.add_argument('--min-time', type = float, default = 0.2, help = 'Seconds to spend timing each benchmark.')
+    parser.add_argument('--episodes', type = int, default = 5, help = 'Simulated games per end-to-end benchmark (0: none).')
+    parser.add_argument('--only', default = '', help = 'Only report benchmarks whose names contain this.')
+    args = parser.parse_args(argv)
+
+    results = run(SIZES, args.repeat, args.min_time, args.episodes, args.only)
+
+    for name, result in sorted(results.items()):
+        print("%-40s %12.3f us" % (name, result['seconds'] * 1e6))
+
+    report = {
+        'meta': {'time': time.time(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor()},
+        'results': results,
+    }
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent = 2)
+    print("Results written to", args.out)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent = 2)
+        print("Baseline written to", args.baseline)
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    except (IOError, OSError):
+        # A gate with nothing to compare against would always pass:
+        print("No baseline at", args.baseline + "; store one with --update-baseline.")
+        return 1
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, before, after in regressions:
+        print("REGRESSION %s: %.3f us -> %.3f us (%+.0f%%)" % (name, before * 1e6, after * 1e6,
+            100 * (after / before - 1)))
+
+    print("%d of %d benchmarks slower than the baseline by more than %.0f%%" % (len(regressions),
+        len([name for name in results if name in baseline]), 100 * args.tolerance))
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
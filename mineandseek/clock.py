@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -
+
+# Where the game loop gets the time from. A clock is called for the current
+# time in seconds; observe() shows it the TotalTime of each observation and
+# reset() is called when a game starts. TickClock counts Minecraft ticks (TotalTime in the
+# observations), which are 1/20 s of game time however fast MsPerTick makes
+# the server run, so beliefs move with the game and not with the wall clock,
+# and a simulated game plays out the same at any speed.
+
+import time
+
+TICK_SECONDS = 0.05     # Game time of one Minecraft tick.
+
+class WallClock:
+    def __call__(self):
+        return time.time()
+
+    def observe(self, total):
+        pass
+
+    def reset(self):
+        pass
+
+class TickClock:
+    # Game seconds since the first observation after reset().
+    def __init__(self):
+        self.reset()
+
+    def __call__(self):
+        return self.ticks * TICK_SECONDS
+
+    def observe(self, total):
+        # NaN when the observation did not say.
+        if total == total:
+            if self.first is None:
+                self.first = total
+
+            self.ticks = max(self.ticks, total - self.first)
+
+    def reset(self):
+        self.first = None
+        self.ticks = 0
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -
+
+# Per-agent command channel. Continuous commands ("move 1", "turn -0.3") hold
+# until replaced, so resending a value that has not changed only loads the
+# command socket. The channel sends a verb's value when it differs from the
+# last one sent by more than `tolerance`, and at most `max_rate` times a
+# second per verb; a change that comes sooner waits, and is overwritten by
+# any newer value, until the verb may be sent again. Anything that is not a
+# verb and a number ("quit") goes straight through.
+
+import time
+
+class CommandChannel:
+    def __init__(self, agent_host, tolerance = 0.01, max_rate = 20.0, clock = time.time):
+        self.agent_host = agent_host
+        self.tolerance = tolerance
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self.clock = clock
+
+        self.last_value = {}
+        self.last_time = {}
+        self.pending = {}
+
+        self.sent = 0
+        self.suppressed = 0     # Same as what was last sent.
+        self.coalesced = 0      # Replaced by a newer value before it was sent.
+
+    def send(self, command):
+        try:
+            verb, value = command.split()
+            value = float(value)
+        except ValueError:
+            self.agent_host.sendCommand(command)
+            self.sent += 1
+            return
+
+        if verb in self.pending:
+            del self.pending[verb]
+            self.coalesced += 1
+
+        last = self.last_value.get(verb)
+        if last is not None and abs(value - last) <= self.tolerance:
+            self.suppressed += 1
+            return
+
+        self.pending[verb] = value
+        self.flush()
+
+    def flush(self):
+        # Sends the waiting values whose verbs may be sent again.
+        if not self.pending:
+            return
+
+        now = self.clock()
+
+        for verb, value in list(self.pending.items()):
+            if now - self.last_time.get(verb, float('-inf')) >= self.interval:
+                self.agent_host.sendCommand('%s %g' % (verb, value))
+                self.sent += 1
+                self.last_value[verb] = value
+                self.last_time[verb] = now
+                del self.pending[verb]
+
+    def stats(self):
+        return {'sent': self.sent, 'suppressed': self.suppressed, 'coalesced': self.coalesced}
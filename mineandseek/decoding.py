@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -
+
+# Decodes observations into preallocated arrays instead of dicts that live on
+# in the game loop. Of the ObservationFromFullStats payload the agents only
+# use their pose, life and TotalTime; those are copied into one row of
+# `record` per agent, and the nearby entities (no farther than the mission's
+# entity range) are kept as (name, x, y, z) tuples, which is all opponent
+# detection needs. A world state with no new observation is not decoded at
+# all. The text itself goes through json.loads: picking the fields out with
+# regular expressions measured no faster than its C decoder.
+
+import json
+import numpy as np
+
+FIELDS = ('Pitch', 'Yaw', 'XPos', 'YPos', 'ZPos', 'Life', 'TotalTime')
+RECORD = np.dtype([(name, np.float64) for name in FIELDS])
+
+class ObservationDecoder:
+    def __init__(self, num_agents, entities = 'entities'):
+        # Unknown fields are NaN:
+        self.values = np.full((num_agents, len(FIELDS)), np.nan)
+        self.record = self.values.view(RECORD)[:, 0]
+
+        self.entities = [[] for x in range(num_agents)]
+        self.count = np.zeros(num_agents, dtype = int)
+        self.key = entities
+
+    def decode(self, i, world_state):
+        # Decodes the latest of agent i's new observations, if it has any,
+        # and says whether it did. Each agent only writes its own row, so
+        # agents on threads of their own may decode at the same time.
+        if world_state.number_of_observations_since_last_state == 0:
+            return False
+
+        obs = json.loads(world_state.observations[-1].text)
+
+        self.values[i] = [obs.get(name, np.nan) for name in FIELDS]
+        self.entities[i] = [(entity['name'], entity['x'], entity['y'], entity['z'])
+            for entity in obs.get(self.key, ())]
+
+        self.count[i] += 1
+        return True
+
+    def pos(self, i):
+        return tuple(self.values[i, 2:5].tolist())
+
+    def totalTime(self, i):
+        return self.values[i, 6]
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -
+
+# Many games on one arena played in lockstep, with everything held in numpy
+# arrays over (games x agents) so that a step costs about the same for one
+# game as for hundreds:
+#
+#   env = BatchEnv(arena, games = 256)
+#   seekers, runners = BatchSeeker(env), BatchRunner(env)
+#   obs = env.reset(range(256))
+#   while not obs['done'].all():
+#       obs, rewards, done = env.step(np.concatenate([seekers.act(obs), runners.act(obs)], axis = 1))
+#
+# Agents move as on the simulator (walking speed, turn rate, sliding along
+# walls, one 1/20 s tick per step), see each other within the entity range
+# when no wall is in between, and each side keeps its beliefs about the
+# other in a BeliefEngine with a belief per game and opponent. A game ends
+# when a Seeker catches a Runner (+1 to the Seekers, -1 to the Runners),
+# when a Runner reaches the diamond block (the other way round) or after
+# max_steps (0 to both). Finished games stand still until they are reset.
+
+import numpy as np
+from .belief import BeliefEngine
+from .clock import TICK_SECONDS
+from .mapcompiler import AGENT_RADIUS, FLOOR
+from .simulator import WALK_SPEED
+
+class BatchEnv:
+    def __init__(self, arena, games, num_seekers = 1, num_runners = 1, entity_range = 40,
+            max_steps = 6000, turn_speed = 840.0):
+        self.arena = arena
+        self.games = games
+        self.num_seekers = num_seekers
+        self.num_runners = num_runners
+        self.num_agents = num_seekers + num_runners
+        self.entity_range = entity_range
+        self.max_steps = max_steps
+        self.turn_speed = turn_speed
+
+        self.solid = arena.map.occupancy
+        self.origin = np.asarray(arena.map.origin)
+        self.goal = np.array(arena.vg['0'])[[0, 2]]
+        self.starts = np.array([arena.index[node] for node in arena.starts])
+
+        shape = (games, self.num_agents)
+        self.pos = np.zeros(shape + (3,))
+        self.yaw = np.zeros(shape)
+        self.start_nodes = np.zeros(shape, dtype = np.intp)
+        self.nearest = np.zeros(shape, dtype = np.intp)
+        self.seeing = np.zeros(shape + (self.num_agents,), dtype = bool)
+        self.steps = np.zeros(games, dtype = int)
+        self.done = np.zeros(games, dtype = bool)
+        self.winner = np.zeros(games, dtype = int)     # 1 Seekers, -1 Runners, 0 nobody yet.
+
+        # What the Seekers believe about each Runner and the other way round:
+        T = arena.transition()
+        self.seeker_beliefs = BeliefEngine(T, games, num_runners)
+        self.runner_beliefs = BeliefEngine(T, games, num_seekers)
+
+        # Whose opponent each agent is:
+        seeker = np.arange(self.num_agents) < num_seekers
+        self.opponents = seeker[:, np.newaxis] != seeker[np.newaxis, :]
+
+        # Each game's own random stream, which policies draw from too:
+        self.rngs = [np.random.default_rng() for g in range(games)]
+
+    def reset(self, seeds = None, mask = None):
+        # Starts new games: all of them, or those where mask is set. Each
+        # game's stream is reseeded with its seed, and Runners start at
+        # waypoints drawn from arena.starts with it, so a seeded game plays
+        # the same whatever batch it is in and wherever.
+        mask = np.ones(self.games, dtype = bool) if mask is None else np.asarray(mask, dtype = bool)
+        games = np.flatnonzero(mask)
+        seeds = [None] * self.games if seeds is None else list(seeds)
+
+        for g in games:
+            self.rngs[g] = np.random.default_rng(seeds[g])
+            self.start_nodes[g, self.num_seekers:] = self.rngs[g].choice(self.starts, self.num_runners)
+
+        positions = self.arena.graph.positions
+        self.start_nodes[games, :self.num_seekers] = self.arena.index['0']
+        self.pos[games] = positions[self.start_nodes[games]]
+        self.pos[games, :self.num_seekers, 0] = self.arena.start[0]
+        self.pos[games, :self.num_seekers, 2] = self.arena.start[1]
+        self.pos[games, :, 1] = FLOOR
+        self.yaw[games] = 0.0
+
+        self.steps[games] = 0
+        self.done[games] = False
+        self.winner[games] = 0
+
+        f0 = np.full(self.arena.num_nodes, 1.0 / self.arena.num_nodes)
+        self.seeker_beliefs.f[games] = f0
+        self.runner_beliefs.f[games] = f0
+
+        self.observe()
+        return self.observation()
+
+    def blocked(self, x, z):
+        # Whether an agent at each (x, z) would overlap a wall.
+        r = AGENT_RADIUS
+        blocked = np.zeros(x.shape, dtype = bool)
+
+        for cx in (np.floor(x - r), np.floor(x + r)):
+            for cz in (np.floor(z - r), np.floor(z + r)):
+                i = cx.astype(np.intp) - self.origin[0]
+                j = cz.astype(np.intp) - self.origin[1]
+                inside = (i >= 0) & (i < self.solid.shape[0]) & (j >= 0) & (j < self.solid.shape[1])
+                blocked |= inside & self.solid[np.where(inside, i, 0), np.where(inside, j, 0)]
+
+        return blocked
+
+    def step(self, actions, dt = TICK_SECONDS):
+        # actions is (games x agents x 2): move and turn, each in [-1, 1].
+        # Returns the observation, the (games x agents) rewards and which
+        # games are over.
+        actions = np.clip(np.asarray(actions, dtype = float), -1, 1)
+        playing = ~self.done
+        move = np.where(playing[:, np.newaxis], actions[..., 0], 0.0)
+        turn = np.where(playing[:, np.newaxis], actions[..., 1], 0.0)
+
+        self.yaw = (self.yaw + turn * self.turn_speed * dt + 180.0) % 360.0 - 180.0
+
+        speed = move * WALK_SPEED * dt
+        rad = np.radians(self.yaw)
+        x, z = self.pos[..., 0], self.pos[..., 2]
+        nx = x - np.sin(rad) * speed
+        nz = z + np.cos(rad) * speed
+
+        # Slide along walls one axis at a time:
+        x = np.where(self.blocked(nx, z), x, nx)
+        z = np.where(self.blocked(x, nz), z, nz)
+        self.pos[..., 0], self.pos[..., 2] = x, z
+
+        self.steps += playing
+
+        # Catches, then Runners home, then time up:
+        xz = self.pos[..., [0, 2]]
+        seekers, runners = xz[:, :self.num_seekers], xz[:, self.num_seekers:]
+        gaps = np.abs(seekers[:, :, np.newaxis] - runners[:, np.newaxis]).sum(axis = -1)
+        caught = (gaps < 1).any(axis = (1, 2))
+        home = (np.abs(runners - self.goal).sum(axis = -1) < 1).any(axis = 1)
+
+        won = playing & caught
+        lost = playing & ~caught & home
+        self.winner[won] = 1
+        self.winner[lost] = -1
+        self.done |= won | lost | (self.steps >= self.max_steps)
+
+        side = np.where(np.arange(self.num_agents) < self.num_seekers, 1.0, -1.0)
+        rewards = (won.astype(float) - lost)[:, np.newaxis] * side
+
+        self.observe(dt)
+        return self.observation(), rewards, self.done.copy()
+
+    def observe(self, dt = None):
+        # Nearest waypoints, who sees whom and the belief updates.
+        games, agents = self.games, self.num_agents
+        graph, arena = self.arena.graph, self.arena
+
+        self.nearest = graph.nearestMany(self.pos[..., [0, 2]].reshape(-1, 2)).reshape(games, agents)
+
+        # Pairs of opponents within the entity range, then the walls:
+        d = np.abs(self.pos[:, :, np.newaxis, [0, 2]] - self.pos[:, np.newaxis, :, [0, 2]]).max(axis = -1)
+        near = self.opponents & (d <= self.entity_range)
+        g, i, j = np.nonzero(near)
+
+        self.seeing[...] = False
+        self.seeing[g, i, j] = arena.sight.visibleMany(self.pos[g, i], self.pos[g, j])
+
+        s = self.num_seekers
+        if dt is not None:
+            self.seeker_beliefs.tick(arena.observations.fusedBatch(self.seeing[:, :s, s:],
+                self.nearest[:, :s], self.pos[:, s:]), dt)
+            self.runner_beliefs.tick(arena.observations.fusedBatch(self.seeing[:, s:, :s],
+                self.nearest[:, s:], self.pos[:, :s]), dt)
+
+    def observation(self):
+        # Stacked copies of everything a policy may use.
+        return {
+            'pos': self.pos.copy(),
+            'yaw': self.yaw.copy(),
+            'nearest': self.nearest.copy(),
+            'seeing': self.seeing.copy(),
+            'seeker_beliefs': self.seeker_beliefs.f.copy(),
+            'runner_beliefs': self.runner_beliefs.f.copy(),
+            'time': self.steps * TICK_SECONDS,
+            'done': self.done.copy(),
+            'winner': self.winner.copy(),
+        }
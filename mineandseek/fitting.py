@@ -0,0 +1,228 @@
+from __future__ import print_function
+# -*- coding: utf-8 -
+
+# Fits the transition model to recorded games with Baum-Welch:
+#
+#   python -m mineandseek.fitting recordings/ --out transition.npz
+#   python seek.py --transition transition.npz
+#
+# The hidden state is the waypoint an agent is at, and what is observed is
+# its recorded position, which is likelier the closer it is to the waypoint
+# (a Gaussian of width sigma). Episodes are padded to one length and the
+# forward-backward passes run over all of them at once, one recorded tick
+# at a time. Only the entries of the edges and self-loops are ever touched,
+# so the fitted matrix keeps the graph's sparsity. Each step of the fitted
+# model stands for the median time between recorded ticks. The waypoints and
+# edges are the ones stored with the recordings, which must all share them.
+
+import argparse
+import functools
+import multiprocessing
+import time
+import numpy as np
+from .belief import saveTransition
+from .recording import find, load
+
+print = functools.partial(print, flush = True)
+
+def sameArena(a, b):
+    # Whether two recordings were made on the same waypoints and edges.
+    return a.vgi == b.vgi and a.vg == b.vg and a.edges == b.edges
+
+def trajectories(paths, role = 'all'):
+    # The x, z positions of the agents playing role, one per agent and game,
+    # the median time between ticks and the first recording, whose waypoints
+    # and edges all the others must share.
+    tracks = []
+    ticks = []
+    first = None
+
+    for path in find(paths):
+        recording = load(path)
+
+        if first is None:
+            first = recording
+        elif not sameArena(first, recording):
+            raise ValueError('%s was recorded on a different arena from %s.' % (path, first.path))
+
+        if len(recording) < 2:
+            continue
+
+        agents = range(len(recording.names))
+        if role == 'seeker':
+            agents = agents[:recording.num_seekers]
+        elif role == 'runner':
+            agents = agents[recording.num_seekers:]
+
+        pos = np.asarray(recording.pos[:, :, [0, 2]], dtype = float)
+        tracks += [pos[:, i] for i in agents]
+        ticks.append(np.diff(recording.time))
+
+    period = float(np.median(np.concatenate(ticks))) if ticks else 0.1
+
+    return tracks, period, first
+
+def emissions(tracks, nodes, sigma):
+    # Padded (episodes x ticks x nodes) likelihoods of the observed positions,
+    # with 1 wherever there is nothing to go by, and the length of each track.
+    lengths = np.array([len(track) for track in tracks])
+    B = np.ones((len(tracks), lengths.max(), len(nodes)))
+
+    for e, track in enumerate(tracks):
+        d2 = ((track[:, None, :] - nodes) ** 2).sum(axis = -1)
+        known = np.isfinite(d2).all(axis = -1)
+        B[e, :len(track)][known] = np.exp(-(d2[known] - d2[known].min(axis = -1, keepdims = True)) / (2 * sigma ** 2))
+
+    return B, lengths
+
+class EdgeModel:
+    # A row-stochastic matrix kept as its edge and self-loop entries, with
+    # f @ T and T @ x as segmented sums over them.
+    def __init__(self, rows, cols, nodes):
+        self.rows = np.asarray(rows, dtype = np.intp)
+        self.cols = np.asarray(cols, dtype = np.intp)
+        self.nodes = nodes
+
+        # Every node has a self-loop, so no row or column is empty:
+        self.by_col = np.argsort(self.cols, kind = 'stable')
+        self.col_starts = np.concatenate([[0], np.cumsum(np.bincount(self.cols, minlength = nodes))])[:-1]
+        self.by_row = np.argsort(self.rows, kind = 'stable')
+        self.row_starts = np.concatenate([[0], np.cumsum(np.bincount(self.rows, minlength = nodes))])[:-1]
+
+    def forward(self, f, values):
+        k = self.by_col
+        return np.add.reduceat(f[:, self.rows[k]] * values[k], self.col_starts, axis = -1)
+
+    def backward(self, x, values):
+        k = self.by_row
+        return np.add.reduceat(x[:, self.cols[k]] * values[k], self.row_starts, axis = -1)
+
+    def normalize(self, counts, values):
+        # New values from expected transition counts; rows never visited
+        # keep the ones they had.
+        totals = np.bincount(self.rows, counts, minlength = self.nodes)[self.rows]
+        return np.where(totals > 0, counts / np.where(totals > 0, totals, 1), values)
+
+def expect(model, values, B, lengths):
+    # E step over a batch of episodes: the expected count of every entry
+    # and the log-likelihood of the batch.
+    episodes, ticks, nodes = B.shape
+    valid = np.arange(ticks) < lengths[:, None]
+
+    # Scaled forward pass:
+    alpha = np.empty_like(B)
+    scale = np.empty((episodes, ticks))
+
+    a = B[:, 0] / nodes
+    for t in range(ticks):
+        if t:
+            a = model.forward(alpha[:, t - 1], values) * B[:, t]
+        scale[:, t] = a.sum(axis = -1)
+        alpha[:, t] = a / scale[:, t, None]
+
+    # Backward pass, summing the expected transitions on the way:
+    counts = np.zeros(len(values))
+    beta = np.ones((episodes, nodes))
+
+    for t in range(ticks - 2, -1, -1):
+        x = B[:, t + 1] * beta / scale[:, t + 1, None]
+        xi = alpha[:, t, model.rows] * values * x[:, model.cols]
+        counts += xi[valid[:, t + 1]].sum(axis = 0)
+        beta = model.backward(x, values)
+
+    return counts, np.log(scale[valid]).sum()
+
+# The batches of emissions, set in each of the pool's workers when it starts:
+_batches = []
+
+def _setBatches(batches):
+    global _batches
+    _batches = batches
+
+def _expectBatch(args):
+    i, model, values = args
+    B, lengths = _batches[i]
+
+    return expect(model, values, B, lengths)
+
+def fit(tracks, nodes, rows, cols, values, sigma = 1.5, iterations = 50, tolerance = 1e-6,
+        processes = 1, batch = 256):
+    # Baum-Welch from the starting values, until the log-likelihood stops
+    # improving by more than tolerance (relative). Returns the fitted values
+    # and the log-likelihood after each iteration.
+    model = EdgeModel(rows, cols, len(nodes))
+    values = np.asarray(values, dtype = float)
+
+    # Similar lengths go together, so that little of a batch is padding:
+    order = sorted(range(len(tracks)), key = lambda e: len(tracks[e]))
+    batches = [emissions([tracks[e] for e in order[i:i + batch]], nodes, sigma)
+        for i in range(0, len(order), batch)]
+
+    # Handed to the workers as they start, which works however they are started:
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initializer = _setBatches, initargs = (batches,))
+    else:
+        pool = None
+        _setBatches(batches)
+    history = []
+
+    try:
+        for iteration in range(iterations):
+            jobs = [(i, model, values) for i in range(len(batches))]
+            results = pool.map(_expectBatch, jobs) if pool else [_expectBatch(job) for job in jobs]
+
+            counts = sum(counts for counts, loglik in results)
+            history.append(sum(loglik for counts, loglik in results))
+            values = model.normalize(counts, values)
+
+            if len(history) > 1 and abs(history[-1] - history[-2]) <= tolerance * abs(history[-2]):
+                break
+    finally:
+        if pool:
+            pool.close()
+        _setBatches([])
+
+    return values, history
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Fit the transition model to recorded games.')
+    parser.add_argument('paths', nargs = '+', help = 'Recordings, or directories holding them.')
+    parser.add_argument('--out', default = 'transition.npz', help = 'Where to write the fitted model.')
+    parser.add_argument('--role', choices = ['all', 'seeker', 'runner'], default = 'all',
+        help = 'Whose movement to fit.')
+    parser.add_argument('--sigma', type = float, default = 1.5, help = 'Spread of positions around a waypoint, in blocks.')
+    parser.add_argument('--iterations', type = int, default = 50)
+    parser.add_argument('--tolerance', type = float, default = 1e-6)
+    parser.add_argument('--processes', type = int, default = 1, help = 'Worker processes for the E step.')
+    args = parser.parse_args(argv)
+
+    from .arena import walkingEntries
+    from .graph import Graph
+
+    try:
+        tracks, period, recording = trajectories(args.paths, args.role)
+    except ValueError as e:
+        print('ERROR:', e)
+        exit(1)
+
+    if not tracks:
+        print('No recordings found.')
+        exit(1)
+
+    # The waypoints and edges the games were recorded on:
+    graph = Graph(recording.vgi, recording.vg, recording.edges)
+    nodes = graph.xz
+    rows, cols, values = walkingEntries(graph)
+
+    start_time = time.time()
+    values, history = fit(tracks, nodes, rows, cols, values, args.sigma, args.iterations,
+        args.tolerance, args.processes)
+
+    print("Fitted %d tracks in %d iterations and %.2f s, log-likelihood %.1f -> %.1f" % (len(tracks),
+        len(history), time.time() - start_time, history[0], history[-1]))
+
+    saveTransition(args.out, graph.vgi, rows, cols, values, period, loglik = history, sigma = args.sigma)
+    print("Transition model with a %.3f s step written to" % period, args.out)
+
+if __name__ == '__main__':
+    main()
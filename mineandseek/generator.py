@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -
+
+# Procedurally generated arenas. A layout divides a w x h brick enclosure into
+# a grid of rooms about `room` blocks across and knocks doorways through the
+# walls of a random spanning tree of them, plus a share `loops` of the other
+# walls so that there is more than one way round; some of those walls go
+# altogether. Every room has a gold block waypoint in its middle, and the
+# diamond block sits against the near wall of one of the first row's rooms.
+# The same seed and size always make the same arena.
+#
+# Layouts and the maps compiled from them are kept in a bank on disk, one
+# directory per seed and size holding the drawing, meta.json and a .npy file
+# per matrix. The tables an Arena derives from the map and would otherwise
+# build on every load, the nearest-waypoint grid's, are banked with it.
+# Loading memory-maps all of them, so an arena is generated and compiled once
+# and then costs next to nothing to open again.
+
+import json
+import os
+import shutil
+import numpy as np
+from . import mapcompiler
+from .mapcompiler import CompiledMap, buildMap
+
+VERSION = 3
+ROOM = 8                # Room size to aim for, in blocks.
+LOOPS = 0.3             # Share of the walls off the spanning tree that get opened.
+OPEN = 0.3              # Share of the opened walls removed altogether.
+
+BANK_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'mine-and-seek', 'arenas')
+
+ARRAYS = ('positions', 'adjacency', 'visibility', 'distances', 'occupancy', 'origin')
+GRID = ('grid_origin', 'grid_shape', 'grid_candidates', 'grid_counts')
+
+def parseSize(text):
+    # "30x40" -> (30, 40)
+    w, h = (int(n) for n in text.lower().split('x'))
+    return w, h
+
+def _cuboid(x1, y1, z1, x2, y2, z2, block_type):
+    return '                    <DrawCuboid x1="%d" y1="%d" z1="%d" x2="%d" y2="%d" z2="%d" type="%s"/>\n' % (
+        x1, y1, z1, x2, y2, z2, block_type)
+
+def _block(x, y, z, block_type):
+    return '                    <DrawBlock x="%d" y="%d" z="%d" type="%s"/>\n' % (x, y, z, block_type)
+
+def _spanningTree(rng, cols, rows):
+    # The walls between rooms crossed by a random depth-first walk from a
+    # random room; a wall is ((i, j), (i + 1, j)) or ((i, j), (i, j + 1)).
+    start = (int(rng.integers(cols)), int(rng.integers(rows)))
+    visited = {start}
+    stack = [start]
+    tree = set()
+
+    while stack:
+        i, j = stack[-1]
+        unvisited = [(a, b) for a, b in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1))
+            if 0 <= a < cols and 0 <= b < rows and (a, b) not in visited]
+
+        if not unvisited:
+            stack.pop()
+            continue
+
+        room = unvisited[rng.integers(len(unvisited))]
+        tree.add(tuple(sorted([(i, j), room])))
+        visited.add(room)
+        stack.append(room)
+
+    return tree
+
+def generateDrawing(seed, size = (30, 40), room = ROOM, loops = LOOPS):
+    # The DrawingDecorator of a new arena, and the (x, z) Seekers start at.
+    w, h = size
+    if w < 6 or h < 6:
+        raise ValueError('An arena needs to be at least 6 x 6 blocks, not %d x %d.' % (w, h))
+
+    rng = np.random.default_rng(seed)
+
+    # Room boundaries, with a room at least 5 blocks across wall to wall:
+    cols = max(min(int(round(w / room)), w // 5), 1)
+    rows = max(min(int(round(h / room)), h // 5), 1)
+    xs = np.linspace(0, w, cols + 1).round().astype(int)
+    zs = np.linspace(0, h, rows + 1).round().astype(int)
+    cx = (xs[:-1] + xs[1:]) // 2
+    cz = (zs[:-1] + zs[1:]) // 2
+
+    walls = [((i, j), (i + 1, j)) for i in range(cols - 1) for j in range(rows)] + \
+        [((i, j), (i, j + 1)) for i in range(cols) for j in range(rows - 1)]
+    tree = _spanningTree(rng, cols, rows)
+
+    drawing = '                  <DrawingDecorator>\n'
+    drawing += '                    <!-- Outer wall -->\n'
+    drawing += _cuboid(0, 4, 0, w, 6, h, 'brick_block')
+    drawing += _cuboid(1, 4, 1, w - 1, 7, h - 1, 'air')
+    drawing += '\n                    <!-- Observer spot -->\n'
+    drawing += _cuboid(0, 25, 0, w, 25, h, 'barrier')
+    drawing += _block(w // 2, 25, h // 2, 'air')
+
+    drawing += '\n                    <!-- Walls between rooms, with doorways -->\n'
+    for a, b in walls:
+        (i, j), vertical = a, b[0] > a[0]
+        opened = (a, b) in tree or rng.random() < loops
+        removed = opened and rng.random() < OPEN
+
+        if vertical:
+            # Between (i, j) and (i + 1, j), along x = xs[i + 1]:
+            x = xs[i + 1]
+            drawing += _cuboid(x, 4, zs[j], x, 6, zs[j + 1], 'brick_block')
+            if removed:
+                drawing += _cuboid(x, 4, zs[j] + 1, x, 6, zs[j + 1] - 1, 'air')
+            elif opened:
+                drawing += _cuboid(x, 4, cz[j] - 1, x, 6, cz[j] + 1, 'air')
+        else:
+            # Between (i, j) and (i, j + 1), along z = zs[j + 1]:
+            z = zs[j + 1]
+            drawing += _cuboid(xs[i], 4, z, xs[i + 1], 6, z, 'brick_block')
+            if removed:
+                drawing += _cuboid(xs[i] + 1, 4, z, xs[i + 1] - 1, 6, z, 'air')
+            elif opened:
+                drawing += _cuboid(cx[i] - 1, 4, z, cx[i] + 1, 6, z, 'air')
+
+    goal = int(cx[rng.integers(cols)])
+    drawing += '\n' + _block(goal, 3, 1, 'diamond_block') + '\n'
+
+    for j in range(rows):
+        for i in range(cols):
+            drawing += _block(cx[i], 3, cz[j], 'gold_block')
+
+    drawing += '                  </DrawingDecorator>\n'
+
+    return drawing, (goal + 0.5, 1.5)
+
+class Layout:
+    # A generated arena: its drawing, where Seekers start, the waypoints
+    # Runners may start at (the farther half from the diamond block), the
+    # compiled map and the tables derived from it, by name.
+    def __init__(self, seed, size, drawing, start, starts, map, tables = None):
+        self.seed = seed
+        self.size = tuple(size)
+        self.drawing = drawing
+        self.start = tuple(start)
+        self.starts = list(starts)
+        self.map = map
+        self.tables = dict(tables or {})
+
+    def grid(self):
+        # The tables of the Graph's nearest-waypoint grid, or None.
+        if all(name in self.tables for name in GRID):
+            return tuple(self.tables[name] for name in GRID)
+
+        return None
+
+    def save(self, path):
+        # Written to a directory of its own and moved into place, so a
+        # half-written layout is never loaded; if another process got there
+        # first, its copy is kept.
+        tmp = '%s.tmp-%d' % (path, os.getpid())
+        os.makedirs(tmp, exist_ok = True)
+
+        for name in ARRAYS:
+            np.save(os.path.join(tmp, name + '.npy'), getattr(self.map, name))
+
+        for name, table in self.tables.items():
+            np.save(os.path.join(tmp, name + '.npy'), table)
+
+        with open(os.path.join(tmp, 'drawing.xml'), 'w') as f:
+            f.write(self.drawing)
+
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'seed': self.seed, 'size': list(self.size), 'start': list(self.start),
+                'starts': self.starts, 'names': self.map.vgi, 'tables': sorted(self.tables)}, f)
+
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors = True)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+
+        with open(os.path.join(path, 'drawing.xml')) as f:
+            drawing = f.read()
+
+        arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode = 'r') for name in ARRAYS]
+        tables = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode = 'r') for name in meta['tables']}
+
+        return cls(meta['seed'], meta['size'], drawing, meta['start'], meta['starts'],
+            CompiledMap(meta['names'], *arrays), tables)
+
+def generate(seed, size = (30, 40)):
+    from .arena import getXML
+
+    drawing, start = generateDrawing(seed, size)
+    compiled = buildMap(getXML([], drawing = drawing, start = start))
+
+    # Waypoints that can reach the diamond block, farthest first:
+    distances = np.asarray(compiled.distances[0])
+    reachable = [i for i in np.argsort(-distances, kind = 'stable') if i and np.isfinite(distances[i])]
+    starts = [compiled.vgi[i] for i in reachable[:max(len(reachable) // 2, 1)]]
+
+    layout = Layout(seed, size, drawing, start, starts, compiled)
+    layout.tables = derivedTables(layout)
+
+    return layout
+
+def derivedTables(layout):
+    # The tables an Arena on layout builds for itself, to bank with it.
+    from .arena import Arena
+
+    arena = Arena(layout = layout)
+
+    return dict(zip(GRID, arena.graph.grid))
+
+def bankPath(seed, size, bank_dir = BANK_DIR):
+    return os.path.join(bank_dir, 'v%d.%d' % (VERSION, mapcompiler.VERSION), '%dx%d-%d' % (size[0], size[1], seed))
+
+def loadLayout(seed, size = (30, 40), bank_dir = BANK_DIR):
+    # The layout for seed and size from the bank, generated and banked the
+    # first time it is asked for. A bank_dir of None skips the bank.
+    if bank_dir is None:
+        return generate(seed, size)
+
+    path = bankPath(seed, size, bank_dir)
+
+    if os.path.exists(path):
+        try:
+            return Layout.load(path)
+        except (IOError, OSError, ValueError, KeyError):
+            # An unreadable entry goes, or the new one could not take its place:
+            shutil.rmtree(path, ignore_errors = True)
+
+    layout = generate(seed, size)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        layout.save(path)
+    except (IOError, OSError):
+        pass
+
+    return layout
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -
+
+# The waypoint graph with integer node ids: node i is vgi[i]. Neighbors are
+# kept in CSR form (indices[indptr[i]:indptr[i + 1]], sorted), with an edge
+# list precomputed and node masks built from them as they are asked for, so
+# hot paths index arrays instead of looking letters up and nothing grows with
+# the number of nodes squared. A uniform grid over the arena maps any position to its
+# nearest waypoint: each cell lists the few waypoints that can be nearest to
+# some point in it, so a query only measures those. The grid's tables can be
+# stored and handed back in, which skips building them.
+
+import math
+import numpy as np
+
+CHUNK_POINTS = 1 << 20  # Cell and node pairs measured at once while building the grid.
+
+class Graph:
+    def __init__(self, vgi, vg, edges, cell_size = 2.0, grid = None):
+        # grid holds the tables of a grid built before, as returned by grid.
+        self.vgi = list(vgi)
+        self.index = {node: i for i, node in enumerate(self.vgi)}
+        self.num_nodes = len(self.vgi)
+
+        self.positions = np.array([vg[node] for node in self.vgi], dtype = float).reshape(-1, 3)
+        self.xz = self.positions[:, [0, 2]]
+
+        neighbors = [sorted(self.index[neighbor] for neighbor in edges[node]) for node in self.vgi]
+        self.indptr = np.concatenate([[0], np.cumsum([len(n) for n in neighbors])]).astype(np.intp)
+        self.indices = np.array([j for n in neighbors for j in n], dtype = np.intp)
+        self.degree = np.diff(self.indptr)
+
+        # (source, target) for every edge, in CSR order:
+        self.edge_list = np.stack([np.repeat(np.arange(self.num_nodes), self.degree), self.indices], axis = 1)
+
+        if grid is None:
+            self.buildGrid(cell_size)
+        else:
+            self.setGrid(cell_size, *grid)
+
+    def neighbors(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def moves(self, nodes):
+        # Where walkers at nodes, an array of ids of any shape, can be one
+        # step later: (... x num_nodes) booleans with each node and its
+        # neighbors set.
+        nodes = np.asarray(nodes, dtype = np.intp)
+        mask = np.zeros((nodes.size, self.num_nodes), dtype = bool)
+        ids = nodes.ravel()
+
+        # Every query's slice of the CSR lists, end to end:
+        counts = self.degree[ids]
+        rows = np.repeat(np.arange(ids.size), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        mask[rows, self.indices[self.indptr[ids][rows] + offsets]] = True
+        mask[np.arange(ids.size), ids] = True
+
+        return mask.reshape(nodes.shape + (self.num_nodes,))
+
+    def buildGrid(self, cell_size):
+        self.cell_size = cell_size
+        self.origin = self.xz.min(axis = 0) - cell_size
+        self.shape = tuple(np.ceil((self.xz.max(axis = 0) + cell_size - self.origin) / cell_size).astype(int))
+
+        # A node can be nearest to a point of a cell only if its distance to
+        # the cell's box is at most the smallest farthest-corner distance.
+        # Cells are measured against every node a chunk at a time, which
+        # keeps the (cells x nodes) distances from being held all at once:
+        lo = self.origin + np.stack(np.meshgrid(np.arange(self.shape[0]), np.arange(self.shape[1]),
+            indexing = 'ij'), axis = -1).reshape(-1, 2) * cell_size
+        chunk = max(CHUNK_POINTS // self.num_nodes, 1)
+        cells, nodes = [], []
+
+        for start in range(0, len(lo), chunk):
+            a = lo[start:start + chunk, np.newaxis]
+            b = a + cell_size
+
+            near = np.sqrt((np.maximum(np.maximum(a - self.xz, self.xz - b), 0) ** 2).sum(axis = -1))
+            far = np.sqrt((np.maximum(np.abs(a - self.xz), np.abs(b - self.xz)) ** 2).sum(axis = -1))
+            c, n = np.nonzero(near <= far.min(axis = 1, keepdims = True))
+
+            cells.append(c + start)
+            nodes.append(n)
+
+        cells = np.concatenate(cells)
+        nodes = np.concatenate(nodes)
+
+        # Each cell's candidates in order, padded with its first one, which
+        # changes no argmin:
+        counts = np.bincount(cells, minlength = len(lo))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        padded = np.repeat(nodes[starts][:, np.newaxis], counts.max(), axis = 1)
+        padded[cells, np.arange(len(cells)) - starts[cells]] = nodes
+
+        self.setGrid(cell_size, self.origin, self.shape, padded, counts)
+
+    @property
+    def grid(self):
+        # The grid's tables: origin, shape, padded candidates and their counts.
+        return self.origin, np.array(self.shape), self.candidates, self.counts
+
+    def setGrid(self, cell_size, origin, shape, candidates, counts):
+        self.cell_size = cell_size
+        self.origin = np.asarray(origin, dtype = float)
+        self.shape = tuple(int(n) for n in shape)
+        self.candidates = np.asarray(candidates, dtype = np.intp)
+        self.counts = np.asarray(counts, dtype = np.intp)
+
+        # The same as plain tuples, for single queries:
+        xz = self.xz.tolist()
+        self.cell_nodes = [[(i,) + tuple(xz[i]) for i in row[:count]]
+            for row, count in zip(self.candidates.tolist(), self.counts.tolist())]
+
+        self.all_nodes = [(i, x, z) for i, (x, z) in enumerate(xz)]
+
+    def nearest(self, x, z):
+        # The nearest waypoint to (x, z), or None if the position is unknown.
+        # Called for every observation, so it stays in plain Python.
+        if not (math.isfinite(x) and math.isfinite(z)):
+            return None
+
+        cx = int((x - self.origin[0]) // self.cell_size)
+        cz = int((z - self.origin[1]) // self.cell_size)
+
+        if 0 <= cx < self.shape[0] and 0 <= cz < self.shape[1]:
+            nodes = self.cell_nodes[cx * self.shape[1] + cz]
+        else:
+            nodes = self.all_nodes
+
+        return min(nodes, key = lambda n: (n[1] - x) ** 2 + (n[2] - z) ** 2)[0]
+
+    def nearestMany(self, points):
+        # Nearest waypoints to an (n x 2) array of finite x, z positions.
+        points = np.asarray(points, dtype = float)
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.intp)
+        inside = ((cells >= 0) & (cells < self.shape)).all(axis = 1)
+
+        nearest = np.empty(len(points), dtype = np.intp)
+
+        c = self.candidates[cells[inside, 0] * self.shape[1] + cells[inside, 1]]
+        d = ((self.xz[c] - points[inside, None]) ** 2).sum(axis = -1)
+        nearest[inside] = c[np.arange(len(c)), d.argmin(axis = 1)]
+
+        # Outside the grid every node is a candidate:
+        if not inside.all():
+            d = ((points[~inside, None] - self.xz) ** 2).sum(axis = -1)
+            nearest[~inside] = d.argmin(axis = 1)
+
+        return nearest
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -
+
+# Compiles a mission's DrawingDecorator into the structures the agents use:
+# a voxel occupancy grid, waypoints at the gold blocks (plus the diamond
+# block as node '0'), the edges an agent can walk, which waypoints can see
+# each other and all-pairs path distances. Results are cached on disk keyed
+# by a hash of the decorator, so an arena only pays the geometry cost once.
+
+import hashlib
+import math
+import os
+import string
+import xml.etree.ElementTree as ET
+import numpy as np
+
+NS = '{http://ProjectMalmo.microsoft.com}'
+
+VERSION = 1
+FLOOR = 4               # First free layer above the default flat world.
+AGENT_HEIGHT = 2
+AGENT_RADIUS = 0.3
+LINE_STEP = 0.1         # Spacing of the line of sight samples, in blocks.
+NODE_CLEARANCE = 1.5    # Edges passing this close to another waypoint go through it instead.
+CHUNK_POINTS = 1 << 20  # Line samples tested at once, which bounds the memory a compile takes.
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'mine-and-seek', 'maps')
+
+def _shape(element):
+    # Inclusive block bounds of one drawing element.
+    if element.tag == NS + 'DrawBlock':
+        p = [int(element.get(k)) for k in ('x', 'y', 'z')]
+        return p, p
+
+    p1 = [int(element.get(k)) for k in ('x1', 'y1', 'z1')]
+    p2 = [int(element.get(k)) for k in ('x2', 'y2', 'z2')]
+
+    return [min(a, b) for a, b in zip(p1, p2)], [max(a, b) for a, b in zip(p1, p2)]
+
+def _line(element):
+    p1 = np.array([int(element.get(k)) for k in ('x1', 'y1', 'z1')])
+    p2 = np.array([int(element.get(k)) for k in ('x2', 'y2', 'z2')])
+    steps = np.abs(p2 - p1).max()
+    t = np.linspace(0, 1, steps + 1)[:, np.newaxis]
+
+    return np.floor(p1 + (p2 - p1) * t + 0.5).astype(int)
+
+class Voxels:
+    # Dense grid of block types; types[grid[x, y, z]] is the block name and
+    # index 0 is air. Coordinates are shifted by origin.
+    def __init__(self, grid, origin, types):
+        self.grid = grid
+        self.origin = np.asarray(origin)
+        self.types = list(types)
+
+    def code(self, block_type):
+        return self.types.index(block_type) if block_type in self.types else -1
+
+    def find(self, block_type):
+        return np.argwhere(self.grid == self.code(block_type)) + self.origin
+
+    def layers(self, y0, y1):
+        # 2D (x, z) occupancy of the layers y0 <= y < y1, with its origin.
+        lo = max(y0 - self.origin[1], 0)
+        hi = max(min(y1 - self.origin[1], self.grid.shape[1]), lo)
+
+        return (self.grid[:, lo:hi, :] != 0).any(axis = 1), self.origin[[0, 2]]
+
+def decorator(xml):
+    root = ET.fromstring(xml)
+    return root.find('.//' + NS + 'DrawingDecorator')
+
+def voxelize(xml):
+    elements = [] if decorator(xml) is None else [e for e in decorator(xml)
+        if e.tag in (NS + 'DrawBlock', NS + 'DrawCuboid', NS + 'DrawLine')]
+
+    if not elements:
+        return Voxels(np.zeros((0, 0, 0), dtype = np.uint8), (0, 0, 0), ['air'])
+
+    bounds = [_shape(e) for e in elements]
+    origin = np.min([lo for lo, hi in bounds], axis = 0)
+    top = np.max([hi for lo, hi in bounds], axis = 0)
+
+    grid = np.zeros(top - origin + 1, dtype = np.uint8)
+    types = ['air']
+
+    for element, (lo, hi) in zip(elements, bounds):
+        block_type = element.get('type')
+
+        if block_type not in types:
+            types.append(block_type)
+
+        code = types.index(block_type)
+
+        if element.tag == NS + 'DrawLine':
+            x, y, z = (_line(element) - origin).T
+            grid[x, y, z] = code
+        else:
+            lo = np.asarray(lo) - origin
+            hi = np.asarray(hi) - origin + 1
+            grid[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]] = code
+
+    return Voxels(grid, origin, types)
+
+def _blocked(occupancy, origin, points):
+    # Whether each (..., 2) continuous (x, z) point is inside a solid cell.
+    cells = np.floor(points).astype(int) - origin
+    inside = ((cells >= 0) & (cells < occupancy.shape)).all(axis = -1)
+    cells = np.where(inside[..., np.newaxis], cells, 0)
+
+    return inside & occupancy[cells[..., 0], cells[..., 1]]
+
+def sightLines(occupancy, origin, a, b, offset = 0.0):
+    # Whether each point of a (k x 2) can see the point of b in the same
+    # row. A positive offset also tests the two lines shifted sideways by it,
+    # which is how wide a walking agent is. Lines go shortest first in chunks
+    # of about CHUNK_POINTS samples, each sampled as finely as its longest
+    # line needs, so memory stays bounded however many there are.
+    a = np.asarray(a, dtype = float).reshape(-1, 2)
+    b = np.asarray(b, dtype = float).reshape(-1, 2)
+    d = b - a
+    length = np.sqrt((d ** 2).sum(axis = -1))
+    normal = np.stack([-d[:, 1], d[:, 0]], axis = -1) / np.maximum(length, 1e-9)[:, np.newaxis]
+    shifts = [0.0, -offset, offset] if offset else [0.0]
+
+    order = np.argsort(length, kind = 'stable')
+    samples = np.maximum(np.ceil(length[order] / LINE_STEP).astype(int) + 1, 2)
+    clear = np.ones(len(a), dtype = bool)
+
+    start = 0
+    while start < len(order):
+        # As many lines as fit the budget at the sampling of the last of them:
+        fits = (np.arange(1, len(order) - start + 1) * samples[start:] * len(shifts)) <= CHUNK_POINTS
+        end = start + max(int(fits.sum()), 1)
+        rows = order[start:end]
+        t = np.linspace(0, 1, samples[end - 1])[:, np.newaxis]
+
+        for shift in shifts:
+            points = (a[rows] + shift * normal[rows])[:, np.newaxis, :] + d[rows, np.newaxis, :] * t
+            clear[rows] &= ~_blocked(occupancy, origin, points).any(axis = -1)
+
+        start = end
+
+    return clear
+
+def lineOfSight(occupancy, origin, a, b, offset = 0.0):
+    # Sight lines from each point of a (n x 2) to each point of b (m x 2).
+    a = np.asarray(a, dtype = float).reshape(-1, 2)
+    b = np.asarray(b, dtype = float).reshape(-1, 2)
+    i, j = np.indices((len(a), len(b))).reshape(2, -1)
+
+    return sightLines(occupancy, origin, a[i], b[j], offset).reshape(len(a), len(b))
+
+def _passesNode(xz, length, i, j):
+    # Whether the edge from waypoint i to waypoint j passes within
+    # NODE_CLEARANCE of some other waypoint between them. Only waypoints
+    # nearer to i than j is, plus the clearance, can; length holds the
+    # straight-line distances between waypoints.
+    between = np.zeros(len(i), dtype = bool)
+    chunk = max(CHUNK_POINTS // max(len(xz), 1), 1)
+
+    for start in range(0, len(i), chunk):
+        a, b = i[start:start + chunk], j[start:start + chunk]
+        pair, k = np.nonzero(length[a] < (length[a, b] + NODE_CLEARANCE)[:, np.newaxis])
+        k_ok = (k != a[pair]) & (k != b[pair])
+        pair, k = pair[k_ok], k[k_ok]
+
+        d = xz[b[pair]] - xz[a[pair]]
+        rel = xz[k] - xz[a[pair]]
+        t = (rel * d).sum(axis = -1) / np.maximum((d ** 2).sum(axis = -1), 1e-9)
+        off = rel - t[:, np.newaxis] * d
+        near = ((off ** 2).sum(axis = -1) < NODE_CLEARANCE ** 2) & (t > 0) & (t < 1)
+
+        between[start + pair[near]] = True
+
+    return between
+
+def _names(count):
+    names = []
+    letters = string.ascii_uppercase
+
+    for i in range(count):
+        name = ''
+        i += 1
+        while i > 0:
+            i, r = divmod(i - 1, 26)
+            name = letters[r] + name
+        names.append(name)
+
+    return names
+
+class CompiledMap:
+    def __init__(self, names, positions, adjacency, visibility, distances, occupancy, origin):
+        self.vgi = list(names)
+        self.positions = np.asarray(positions)
+        self.adjacency = np.asarray(adjacency, dtype = bool)
+        self.visibility = np.asarray(visibility, dtype = bool)
+        self.distances = np.asarray(distances)
+        self.occupancy = np.asarray(occupancy, dtype = bool)
+        self.origin = np.asarray(origin)
+
+        self.vg = {node: tuple(float(c) for c in p) for node, p in zip(self.vgi, self.positions)}
+        self.edges = {node: set(self.vgi[j] for j in np.flatnonzero(self.adjacency[i]))
+            for i, node in enumerate(self.vgi)}
+        self.can_see = {node: set(self.vgi[j] for j in np.flatnonzero(self.visibility[i]))
+            for i, node in enumerate(self.vgi)}
+
+    def save(self, path):
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(tmp, names = np.array(self.vgi), positions = self.positions,
+            adjacency = self.adjacency, visibility = self.visibility, distances = self.distances,
+            occupancy = self.occupancy, origin = self.origin)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle = False) as data:
+            return cls(list(data['names']), data['positions'], data['adjacency'],
+                data['visibility'], data['distances'], data['occupancy'], data['origin'])
+
+def mapKey(xml):
+    element = decorator(xml)
+    text = b'' if element is None else ET.tostring(element)
+
+    return hashlib.sha1(b'%d:' % VERSION + text).hexdigest()
+
+def buildMap(xml):
+    voxels = voxelize(xml)
+    occupancy, origin = voxels.layers(FLOOR, FLOOR + AGENT_HEIGHT)
+
+    # Node '0' is the diamond block the Runner must reach, then the gold
+    # blocks in reading order (by row, then right to left as the view shows them).
+    goal = [tuple(p) for p in voxels.find('diamond_block')]
+    gold = sorted((tuple(p) for p in voxels.find('gold_block')), key = lambda p: (p[2], -p[0]))
+    names = ['0'] * len(goal[:1]) + _names(len(gold))
+    blocks = goal[:1] + gold
+
+    positions = np.array([(x + 0.5, y, z + 0.5) for x, y, z in blocks], dtype = float).reshape(-1, 3)
+    xz = positions[:, [0, 2]]
+    n = len(names)
+
+    # Sight lines are symmetric, so each pair is tested once. Walking room
+    # is only tested where the center line is clear:
+    iu, ju = np.triu_indices(n, 1)
+    visible = sightLines(occupancy, origin, xz[iu], xz[ju])
+    walk = np.zeros(len(iu), dtype = bool)
+    walk[visible] = sightLines(occupancy, origin, xz[iu[visible]], xz[ju[visible]], AGENT_RADIUS)
+
+    # Drop edges that run through another waypoint; they go via that one:
+    length = np.sqrt(((xz[:, np.newaxis, :] - xz[np.newaxis, :, :]) ** 2).sum(axis = -1))
+    walk[walk] = ~_passesNode(xz, length, iu[walk], ju[walk])
+
+    visibility = np.zeros((n, n), dtype = bool)
+    visibility[iu, ju] = visible
+    visibility |= visibility.T
+    visibility[np.diag_indices(n)] = sightLines(occupancy, origin, xz, xz)
+
+    adjacency = np.zeros((n, n), dtype = bool)
+    adjacency[iu, ju] = walk
+    adjacency |= adjacency.T
+
+    # All-pairs shortest path lengths over the edges (Floyd-Warshall):
+    distances = np.where(adjacency, length, np.inf)
+    np.fill_diagonal(distances, 0)
+    for k in range(n):
+        distances = np.minimum(distances, distances[:, k, np.newaxis] + distances[np.newaxis, k, :])
+
+    return CompiledMap(names, positions, adjacency, visibility, distances, occupancy, origin)
+
+def compileMap(xml, cache_dir = CACHE_DIR):
+    if cache_dir is None:
+        return buildMap(xml)
+
+    path = os.path.join(cache_dir, mapKey(xml) + '.npz')
+
+    if os.path.exists(path):
+        try:
+            return CompiledMap.load(path)
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+    compiled = buildMap(xml)
+
+    try:
+        os.makedirs(cache_dir, exist_ok = True)
+        compiled.save(path)
+    except (IOError, OSError):
+        pass
+
+    return compiled
@@ -0,0 +1,640 @@
+from __future__ import print_function
+# -*- coding: utf-8 -
+
+# Running a game: starting the mission on a Malmo backend, the control loop
+# and the command-line entry point. Malmo, the simulator and Tk are only
+# imported once a mission actually needs them.
+
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import numpy as np
+from .agents import Runner, Seeker, Team
+from .arena import Arena, distance, runnerNames, seekerNames
+from .generator import loadLayout, parseSize
+from .planner import Planner
+from .clock import TickClock, WallClock
+from .decoding import ObservationDecoder
+from .profiling import NullProfiler, Profiler
+from .recording import Recorder
+from .sharedstate import StatePublisher
+
+print = functools.partial(print, flush = True)
+
+# The Malmo backend, set by loadBackend():
+MalmoPython = None
+
+def loadBackend(simulate = False):
+    global MalmoPython
+
+    if simulate:
+        from . import simulator as backend
+    else:
+        import MalmoPython as backend
+
+    MalmoPython = backend
+    return backend
+
+def safeStartMission(agent_host, mission, client_pool, mission_record, role, expId):
+    used_attempts = 0
+    max_attempts = 5
+    print("Calling startMission for role", role)
+    while True:
+        try:
+            # Attempt start:
+            agent_host.startMission(mission, client_pool, mission_record, role, expId)
+            break
+        except MalmoPython.MissionException as e:
+            errorCode = e.details.errorCode
+            if errorCode == MalmoPython.MissionErrorCode.MISSION_SERVER_WARMING_UP:
+                print("Server not quite ready yet - waiting...")
+                time.sleep(2)
+            elif errorCode == MalmoPython.MissionErrorCode.MISSION_INSUFFICIENT_CLIENTS_AVAILABLE:
+                print("Not enough available Minecraft instances running.")
+                used_attempts += 1
+                if used_attempts < max_attempts:
+                    print("Will wait in case they are starting up.", max_attempts - used_attempts, "attempts left.")
+                    time.sleep(2)
+            elif errorCode == MalmoPython.MissionErrorCode.MISSION_SERVER_NOT_FOUND:
+                print("Server not found - has the mission with role 0 been started yet?")
+                used_attempts += 1
+                if used_attempts < max_attempts:
+                    print("Will wait and retry.", max_attempts - used_attempts, "attempts left.")
+                    time.sleep(2)
+            else:
+                print("Other error:", e.message)
+                print("Waiting will not help here - bailing immediately.")
+                exit(1)
+        if used_attempts == max_attempts:
+            print("All chances used up - bailing now.")
+            exit(1)
+    print("startMission called okay.")
+
+def safeWaitForStart(agent_hosts, poll_interval = 0.1):
+    print("Waiting for the mission to start", end=' ')
+    start_flags = [False for a in agent_hosts]
+    start_time = time.time()
+    time_out = 120  # Allow a two minute timeout.
+    while not all(start_flags) and time.time() - start_time < time_out:
+        states = [a.peekWorldState() for a in agent_hosts]
+        start_flags = [w.has_mission_begun for w in states]
+        errors = [e for w in states for e in w.errors]
+        if len(errors) > 0:
+            print("Errors waiting for mission start:")
+            for e in errors:
+                print(e.text)
+            print("Bailing now.")
+            exit(1)
+        time.sleep(poll_interval)
+        print(".", end=' ')
+    if time.time() - start_time >= time_out:
+        print("Timed out while waiting for mission to start - bailing.")
+        exit(1)
+    print()
+    print("Mission has started.")
+
+def makeTeams(agent_hosts, arena, num_seekers, runner_nodes, plan_budget = 0, clock = time.time):
+    # With a plan_budget (in seconds), agents choose waypoints by lookahead.
+    # Their commands are rate-limited by clock.
+    seekers = [Seeker(agent_hosts[i], name, arena, clock = clock) for i, name in enumerate(seekerNames(num_seekers))]
+    runners = [Runner(agent_hosts[num_seekers + i], name, arena, node, clock)
+        for i, (name, node) in enumerate(zip(runnerNames(len(runner_nodes)), runner_nodes))]
+
+    if plan_budget > 0:
+        for agent in seekers:
+            agent.planner = Planner(arena, 'Seeker', plan_budget)
+        for agent in runners:
+            agent.planner = Planner(arena, 'Runner', plan_budget)
+
+    return seekers, runners, Team(arena, seekers, runners), Team(arena, runners, seekers)
+
+def rolloutsPerDecision(agents):
+    planners = [agent.planner for agent in agents if agent.planner is not None]
+    decisions = sum(planner.decisions for planner in planners)
+
+    return sum(planner.rollouts for planner in planners) / decisions if decisions else None
+
+def commandStats(agents):
+    stats = [agent.commands.stats() for agent in agents]
+
+    return {key: sum(s[key] for s in stats) for key in stats[0]} if stats else {}
+
+def runGame(agent_hosts, arena, num_seekers, runner_nodes, now = WallClock(),
+        view = None, profiler = NullProfiler(), recorder = None, plan_budget = 0, tick_interval = 0.1,
+        publisher = None):
+    # Plays one started mission to the end and returns the outcome, polling
+    # the agents in turn.
+    num_agents = len(agent_hosts)
+    vg = arena.vg
+
+    decoder = ObservationDecoder(num_agents)
+    seeing = [set() for x in range(num_agents)]
+    rewards = [0.0 for x in range(num_agents)]
+    unresponsive_count = [10 for x in range(num_agents)]
+    num_responsive_agents = lambda: sum([urc > 0 for urc in unresponsive_count])
+
+    seekers, runners, seeker_team, runner_team = makeTeams(agent_hosts, arena, num_seekers,
+        runner_nodes, plan_budget, now)
+    agents = seekers + runners
+
+    if view is not None:
+        view.start(seekers, runners)
+
+    timed_out = False
+    winner = None
+    now.reset()
+    start_time = ai_timer = now()
+    world_state = None
+
+    try:
+        while num_responsive_agents() > 0 and not timed_out:
+            profiler.count('loop')
+
+            for i in range(num_agents):
+                agent = agent_hosts[i]
+
+                with profiler.phase('getWorldState'):
+                    world_state = agent.getWorldState()
+
+                rewards[i] += sum(r.getValue() for r in world_state.rewards)
+
+                if world_state.is_mission_running == False:
+                    timed_out = True
+
+                # The last observation still counts when the mission just ended:
+                if world_state.number_of_observations_since_last_state > 0:
+                    unresponsive_count[i] = 10
+
+                    # Only the latest observation is used; count the ones skipped:
+                    profiler.count('observations', world_state.number_of_observations_since_last_state)
+                    profiler.count('dropped_observations', world_state.number_of_observations_since_last_state - 1)
+
+                    with profiler.phase('parse'):
+                        decoder.decode(i, world_state)
+                    seeing[i] = set()
+                    now.observe(decoder.totalTime(i))
+
+                # Tick time comes in whole ticks, so a dt of exactly
+                # tick_interval is due, float error or not:
+                dt = now() - ai_timer
+                if dt >= tick_interval - 1e-6:
+                    with profiler.phase('belief'):
+                        seeker_team.tick(dt)
+                        runner_team.tick(dt)
+                    profiler.count('belief_updates')
+
+                    if recorder is not None:
+                        with profiler.phase('record'):
+                            recorder.record(now(), seekers, runners, seeker_team, runner_team)
+
+                    if publisher is not None:
+                        with profiler.phase('publish'):
+                            publisher.publish(now(), seekers, runners, seeker_team, runner_team)
+
+                    ai_timer = now()
+
+                me = agents[i]
+
+                # Nothing to steer by until the agent's first observation:
+                if not decoder.count[i]:
+                    continue
+
+                with profiler.phase('sight'):
+                    seeing[i] |= arena.spotted(decoder.pos(i), decoder.entities[i],
+                        [opponent.name for opponent in me.team.opponents])
+
+                with profiler.phase('control'):
+                    me.update(decoder.record[i], seeing[i])
+                    me.loop()
+                profiler.count('control_steps')
+
+            if any(distance(*seeker.pos, *runner.pos) < 1 for seeker in seekers for runner in runners):
+                print("Seeker wins!")
+                winner = 'Seeker'
+                timed_out = True
+
+            if any(distance(*runner.pos, *vg['0']) < 1 for runner in runners):
+                print("Runner wins!")
+                winner = 'Runner'
+                timed_out = True
+
+            if view is not None:
+                with profiler.phase('draw'):
+                    view.update()
+    except KeyboardInterrupt:
+        pass
+
+    # A catch may end the mission before the loop sees the agents meet:
+    if winner is None and sum(rewards[:num_seekers]) > 0:
+        winner = 'Seeker'
+
+    if view is not None:
+        view.stop()
+
+    return {
+        'winner': winner,
+        'world_state': world_state,
+        'rewards': rewards,
+        'duration': now() - start_time,
+        'rollouts_per_decision': rolloutsPerDecision(agents),
+        'commands': commandStats(agents),
+    }
+
+def runGameConcurrent(agent_hosts, arena, num_seekers, runner_nodes, now = WallClock(),
+        view = None, profiler = NullProfiler(), recorder = None, plan_budget = 0,
+        poll_interval = 0.005, tick_interval = 0.1, publisher = None, ms_per_tick = 50):
+    # Plays one started mission like runGame, but every agent polls its own
+    # host on a thread of its own and reacts as soon as its observations
+    # arrive, so a slow agent does not hold up the others. The HMMs tick on
+    # a timer thread every tick_interval seconds of the clock now, and this
+    # thread only watches for the end of the game and draws the view.
+    num_agents = len(agent_hosts)
+    vg = arena.vg
+
+    decoder = ObservationDecoder(num_agents)
+    rewards = [0.0 for x in range(num_agents)]
+    world_states = [None for x in range(num_agents)]
+
+    seekers, runners, seeker_team, runner_team = makeTeams(agent_hosts, arena, num_seekers,
+        runner_nodes, plan_budget, now)
+    agents = seekers + runners
+
+    stop = threading.Event()
+    now.reset()
+
+    def control(i):
+        agent_host, me = agent_hosts[i], agents[i]
+        opponents = [opponent.name for opponent in me.team.opponents]
+
+        while not stop.is_set():
+            with profiler.phase('getWorldState'):
+                world_state = agent_host.getWorldState()
+
+            world_states[i] = world_state
+            rewards[i] += sum(r.getValue() for r in world_state.rewards)
+
+            # The last observation still counts when the mission just ended:
+            if world_state.number_of_observations_since_last_state > 0:
+                profiler.count('observations', world_state.number_of_observations_since_last_state)
+                profiler.count('dropped_observations', world_state.number_of_observations_since_last_state - 1)
+
+                with profiler.phase('react'):
+                    with profiler.phase('parse'):
+                        decoder.decode(i, world_state)
+                    now.observe(decoder.totalTime(i))
+
+                    with profiler.phase('sight'):
+                        seeing = arena.spotted(decoder.pos(i), decoder.entities[i], opponents)
+
+                    with profiler.phase('control'):
+                        me.update(decoder.record[i], seeing)
+                        me.loop()
+                profiler.count('control_steps')
+            elif world_state.is_mission_running:
+                time.sleep(poll_interval)
+
+            if not world_state.is_mission_running:
+                break
+
+    # Wall seconds per second of now; game time runs faster than the wall
+    # clock when a tick takes less than 50 ms:
+    scale = ms_per_tick / 50.0 if isinstance(now, TickClock) else 1.0
+
+    def believe():
+        ai_timer = now()
+        wait = tick_interval * scale
+
+        while not stop.wait(wait):
+            # As in runGame, a tick is due once the clock has moved on by
+            # tick_interval; a game running behind gets looked at again soon:
+            dt = now() - ai_timer
+            if dt < tick_interval - 1e-6:
+                wait = max((tick_interval - dt) * scale, poll_interval)
+                continue
+            wait = tick_interval * scale
+
+            with profiler.phase('belief'):
+                seeker_team.tick(dt)
+                runner_team.tick(dt)
+            profiler.count('belief_updates')
+
+            if recorder is not None:
+                with profiler.phase('record'):
+                    recorder.record(now(), seekers, runners, seeker_team, runner_team)
+
+            if publisher is not None:
+                with profiler.phase('publish'):
+                    publisher.publish(now(), seekers, runners, seeker_team, runner_team)
+
+            ai_timer += dt
+
+    controllers = [threading.Thread(target = control, args = (i,), name = agents[i].name)
+        for i in range(num_agents)]
+    threads = controllers + [threading.Thread(target = believe, name = 'beliefs')]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    if view is not None:
+        view.start(seekers, runners)
+
+    winner = None
+    start_time = now()
+
+    try:
+        while True:
+            profiler.count('loop')
+            running = any(thread.is_alive() for thread in controllers)
+
+            if any(distance(*seeker.pos, *runner.pos) < 1 for seeker in seekers for runner in runners):
+                print("Seeker wins!")
+                winner = 'Seeker'
+                break
+
+            if any(distance(*runner.pos, *vg['0']) < 1 for runner in runners):
+                print("Runner wins!")
+                winner = 'Runner'
+                break
+
+            # Checked once more after the last observations are in:
+            if not running:
+                break
+
+            if view is not None:
+                view.update()
+
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    # A catch may end the mission before the positions show the agents meet:
+    if winner is None and sum(rewards[:num_seekers]) > 0:
+        winner = 'Seeker'
+
+    if view is not None:
+        view.stop()
+
+    return {
+        'winner': winner,
+        'world_state': world_states[0],
+        'rewards': rewards,
+        'duration': now() - start_time,
+        'rollouts_per_decision': rolloutsPerDecision(agents),
+        'commands': commandStats(agents),
+    }
+
+def endMission(agent_hosts, poll_interval = 0.1):
+    # Quits the mission if it is still running and waits until every host
+    # has seen it end, so that they can start the next one.
+    for agent_host in agent_hosts:
+        if agent_host.peekWorldState().is_mission_running:
+            agent_host.sendCommand("quit")
+
+    start_time = time.time()
+    time_out = 60
+    while any(a.peekWorldState().is_mission_running for a in agent_hosts):
+        if time.time() - start_time >= time_out:
+            print("Timed out while waiting for the mission to end - bailing.")
+            exit(1)
+        for agent_host in agent_hosts:
+            agent_host.getWorldState()
+        time.sleep(poll_interval)
+
+def runEpisode(agent_hosts, client_pool, arena, num_seekers, now = WallClock(), view = None,
+        profiler = NullProfiler(), poll_interval = 0.1, settle_time = 1, force_reset = True,
+        keep_world = False, concurrent = False, record = None, plan_budget = 0, seed = None,
+        ms_per_tick = 50, entity_range = 40, publisher = None):
+    # Starts one game with new Runner starts drawn from arena.starts and its
+    # own expID, plays it and waits for the mission to end. With record set,
+    # the game is recorded to that directory; with a publisher, its state is
+    # published as it goes. A seed makes the Runner starts and every choice
+    # the agents make repeat; in lockstep on the simulator, so does the whole
+    # game. Agents spot each other within entity_range blocks.
+    num_runners = len(agent_hosts) - num_seekers
+
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed % 2 ** 32)
+
+    runner_nodes = [random.choice(arena.starts) for x in range(num_runners)]
+    my_mission = MalmoPython.MissionSpec(arena.missionXML([arena.vg[node] for node in runner_nodes],
+        num_seekers, force_reset, keep_world, ms_per_tick, entity_range), True)
+    my_mission_record = MalmoPython.MissionRecordSpec()
+
+    expID = str(uuid.uuid4())
+    wall_time = time.time()
+
+    for i in range(len(agent_hosts)):
+        agent_hosts[i].setRewardsPolicy(MalmoPython.RewardsPolicy.KEEP_ALL_REWARDS)
+        safeStartMission(agent_hosts[i], my_mission, client_pool, my_mission_record, i, expID)
+
+    safeWaitForStart(agent_hosts, poll_interval)
+    time.sleep(settle_time)
+
+    if record:
+        recorder = Recorder(record, arena.vgi, arena.vg, arena.edges,
+            seekerNames(num_seekers) + runnerNames(num_runners), num_seekers, size = arena.size)
+    else:
+        recorder = None
+
+    if concurrent:
+        result = runGameConcurrent(agent_hosts, arena, num_seekers, runner_nodes, now, view, profiler, recorder,
+            plan_budget, publisher = publisher, ms_per_tick = ms_per_tick)
+    else:
+        result = runGame(agent_hosts, arena, num_seekers, runner_nodes, now, view, profiler, recorder,
+            plan_budget, publisher = publisher)
+    endMission(agent_hosts, poll_interval)
+
+    result = {
+        'exp_id': expID,
+        'seed': seed,
+        'runner_nodes': runner_nodes,
+        'winner': result['winner'],
+        'rewards': result['rewards'],
+        'duration': result['duration'],
+        'wall_time': time.time() - wall_time,
+        'rollouts_per_decision': result['rollouts_per_decision'],
+        'commands': result['commands'],
+    }
+
+    if recorder is not None:
+        recorder.close(**result)
+
+    return result
+
+def runEpisodes(agent_hosts, client_pool, arena, num_seekers, episodes, now = WallClock(),
+        view = None, profiler = NullProfiler(), poll_interval = 0.1, settle_time = 1,
+        concurrent = False, record = None, plan_budget = 0, seed = None, ms_per_tick = 50,
+        entity_range = 40, publisher = None):
+    # Plays games back to back on the same hosts and clients. The world is
+    # generated for the first game and kept for the rest. With record set,
+    # game n is recorded to <record>/episode-<n>; with seed set, it is
+    # played with seed + n.
+    results = []
+
+    for episode in range(episodes):
+        result = runEpisode(agent_hosts, client_pool, arena, num_seekers, now, view, profiler,
+            poll_interval, settle_time, force_reset = episode == 0, keep_world = episode < episodes - 1,
+            concurrent = concurrent, record = record and os.path.join(record, 'episode-%04d' % episode),
+            plan_budget = plan_budget, seed = None if seed is None else seed + episode,
+            ms_per_tick = ms_per_tick, entity_range = entity_range, publisher = publisher)
+        result['episode'] = episode
+        results.append(result)
+
+        print("Episode %d: %s in %.1f s" % (episode, (result['winner'] or 'Nobody') + ' wins', result['duration']))
+        print("Commands: %(sent)d sent, %(suppressed)d unchanged, %(coalesced)d coalesced" % result['commands'])
+        if result['rollouts_per_decision'] is not None:
+            print("Planner: %.0f rollouts per decision" % result['rollouts_per_decision'])
+
+    return results
+
+def main(argv = None):
+    argv = sys.argv if argv is None else argv
+
+    # Pick the backend before parsing, so the simulator runs without Malmo installed:
+    simulate = '--simulate' in argv[1:] or '-s' in argv[1:]
+    loadBackend(simulate)
+
+    # Create one agent host for parsing:
+    agent_hosts = [MalmoPython.AgentHost()]
+
+    # Parse the command-line options:
+    agent_hosts[0].addOptionalFlag("debug,d", "Display debug information.")
+    agent_hosts[0].addOptionalIntArgument("agents,n", "Number of agents to use.", 2)
+    agent_hosts[0].addOptionalIntArgument("seekers", "Number of agents playing Seeker; the rest play Runner.", 1)
+    agent_hosts[0].addOptionalFlag("simulate,s", "Run on the headless simulator instead of Minecraft.")
+    agent_hosts[0].addOptionalFlag("no-gui", "Do not open the belief visualizer.")
+    agent_hosts[0].addOptionalIntArgument("fps", "Frame cap of the belief visualizer.", 10)
+    agent_hosts[0].addOptionalFlag("lockstep", "Poll the agents in turn from one thread; on the simulator, run as fast as possible.")
+    agent_hosts[0].addOptionalIntArgument("episodes", "Number of games to play back to back on the same clients.", 1)
+    agent_hosts[0].addOptionalStringArgument("results", "Write per-game results to this JSON file.", "")
+    agent_hosts[0].addOptionalIntArgument("plan", "Choose waypoints by Monte Carlo lookahead, spending this many ms per decision (0: greedy).", 0)
+    agent_hosts[0].addOptionalStringArgument("transition", "Load the transition model from this file, as written by mineandseek.fitting.", "")
+    agent_hosts[0].addOptionalStringArgument("record", "Record every game to <record>/episode-<n> for mineandseek.replay.", "")
+    agent_hosts[0].addOptionalIntArgument("seed", "Seed game n with seed + n, so that games can be replayed (-1: unseeded).", -1)
+    agent_hosts[0].addOptionalIntArgument("ms-per-tick", "Wall-clock ms per Minecraft tick; below 50 runs faster than real time.", 50)
+    agent_hosts[0].addOptionalIntArgument("arena-seed", "Play on the arena mineandseek.generator makes from this seed (-1: the hand-drawn one).", -1)
+    agent_hosts[0].addOptionalStringArgument("arena-size", "Width x depth of a generated arena, in blocks.", "30x40")
+    agent_hosts[0].addOptionalIntArgument("entity-range", "How far away, in blocks, agents are told about each other.", 40)
+    agent_hosts[0].addOptionalFlag("wall-clock", "Time beliefs by the wall clock instead of by Minecraft ticks.")
+    agent_hosts[0].addOptionalStringArgument("publish", "Publish the game state to the shared memory block of this name for mineandseek.sharedstate.", "")
+    agent_hosts[0].addOptionalStringArgument("profile", "Write loop timings to <profile>.summary.json and <profile>.trace.json.", "")
+
+    try:
+        agent_hosts[0].parse(argv)
+    except RuntimeError as e:
+        print('ERROR:', e)
+        print(agent_hosts[0].getUsage())
+        exit(1)
+    if agent_hosts[0].receivedArgument("help"):
+        print(agent_hosts[0].getUsage())
+        exit(0)
+
+    DEBUG = agent_hosts[0].receivedArgument("debug")
+    NUM_AGENTS = agent_hosts[0].getIntArgument("agents")
+    NUM_SEEKERS = agent_hosts[0].getIntArgument("seekers")
+    NUM_RUNNERS = NUM_AGENTS - NUM_SEEKERS
+
+    if NUM_SEEKERS < 1 or NUM_RUNNERS < 1:
+        print('ERROR: need at least one Seeker and one Runner.')
+        print(agent_hosts[0].getUsage())
+        exit(1)
+
+    SHOW_GUI = not agent_hosts[0].receivedArgument("no-gui")
+    FPS = agent_hosts[0].getIntArgument("fps")
+    PROFILE = agent_hosts[0].getStringArgument("profile")
+    EPISODES = agent_hosts[0].getIntArgument("episodes")
+    RESULTS = agent_hosts[0].getStringArgument("results")
+    RECORD = agent_hosts[0].getStringArgument("record")
+    TRANSITION = agent_hosts[0].getStringArgument("transition")
+    PLAN_BUDGET = agent_hosts[0].getIntArgument("plan") / 1000.0
+    SEED = agent_hosts[0].getIntArgument("seed")
+    SEED = None if SEED < 0 else SEED
+    MS_PER_TICK = agent_hosts[0].getIntArgument("ms-per-tick")
+    ARENA_SEED = agent_hosts[0].getIntArgument("arena-seed")
+    ARENA_SIZE = parseSize(agent_hosts[0].getStringArgument("arena-size"))
+    ENTITY_RANGE = agent_hosts[0].getIntArgument("entity-range")
+    WALL_CLOCK = agent_hosts[0].receivedArgument("wall-clock")
+    CONCURRENT = not agent_hosts[0].receivedArgument("lockstep")
+    PUBLISH = agent_hosts[0].getStringArgument("publish")
+
+    agent_hosts += [MalmoPython.AgentHost() for x in range(1, NUM_AGENTS)]
+
+    # Set up debug output:
+    for ah in agent_hosts:
+        ah.setDebugOutput(DEBUG) # Turn client-pool connection messages on/off.
+
+    layout = loadLayout(ARENA_SEED, ARENA_SIZE) if ARENA_SEED >= 0 else None
+    arena = Arena(transition_file = TRANSITION or None, layout = layout)
+
+    # Set up a client pool
+    client_pool = MalmoPython.ClientPool()
+    for x in range(10000, 10000 + NUM_AGENTS):
+        client_pool.add(MalmoPython.ClientInfo('127.0.0.1', x))
+
+    if SHOW_GUI:
+        # Only import Tk when there is a window to show:
+        from .render import GraphView
+        view = GraphView(arena.vgi, arena.vg, arena.edges, arena.size, fps = FPS)
+    else:
+        view = None
+
+    # Beliefs follow the game's ticks, however fast the game runs:
+    now = WallClock() if WALL_CLOCK else TickClock()
+
+    profiler = Profiler() if PROFILE else NullProfiler()
+
+    if PUBLISH:
+        publisher = StatePublisher(PUBLISH, arena.vgi, arena.vg, arena.edges,
+            seekerNames(NUM_SEEKERS) + runnerNames(NUM_RUNNERS), NUM_SEEKERS, arena.size)
+        print("Publishing the game state to", PUBLISH)
+    else:
+        publisher = None
+
+    try:
+        if simulate:
+            # Agents on threads of their own need the simulator to keep to the clock:
+            MalmoPython.setRealTime(CONCURRENT)
+            results = runEpisodes(agent_hosts, client_pool, arena, NUM_SEEKERS, EPISODES, now, view,
+                profiler, poll_interval = 0, settle_time = 0, concurrent = CONCURRENT, record = RECORD,
+                plan_budget = PLAN_BUDGET, seed = SEED, ms_per_tick = MS_PER_TICK, entity_range = ENTITY_RANGE,
+                publisher = publisher)
+        else:
+            results = runEpisodes(agent_hosts, client_pool, arena, NUM_SEEKERS, EPISODES, now, view,
+                profiler, concurrent = CONCURRENT, record = RECORD, plan_budget = PLAN_BUDGET, seed = SEED,
+                ms_per_tick = MS_PER_TICK, entity_range = ENTITY_RANGE, publisher = publisher)
+    finally:
+        # Readers keep what they have mapped; the name goes away:
+        if publisher is not None:
+            publisher.close()
+
+        if view is not None:
+            view.destroy()
+
+    if PROFILE:
+        profiler.export(PROFILE)
+        print("Loop profile written to", PROFILE + ".summary.json and", PROFILE + ".trace.json")
+
+    # mission has ended.
+    print("Mission over")
+
+    seeker_wins = sum(result['winner'] == 'Seeker' for result in results)
+    runner_wins = sum(result['winner'] == 'Runner' for result in results)
+    print("Seeker won %d, Runner won %d of %d games" % (seeker_wins, runner_wins, len(results)))
+
+    if RESULTS:
+        with open(RESULTS, 'w') as f:
+            json.dump({'seeker_wins': seeker_wins, 'runner_wins': runner_wins,
+                'episodes': results}, f, indent = 2)
+        print("Results written to", RESULTS)
+
+    return results
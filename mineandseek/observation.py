@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -
+
+# Observation likelihoods for the belief update. When the opponent is in
+# sight, the likelihood of each node depends only on which cell of a
+# quantized grid over the arena it was seen in. Those rows are computed as
+# cells come up and kept in an LRU cache, since a full (cells x nodes)
+# table runs to hundreds of MB on large arenas. When it is not in sight,
+# the node of the observer and its neighbors are ruled out, by masks built
+# from the graph's neighbor lists as they are needed.
+
+import math
+import numpy as np
+from functools import lru_cache
+
+class ObservationModel:
+    def __init__(self, graph, size = (30, 40), resolution = 0.25, speed = 4.3, cache_size = 4096):
+        self.resolution = resolution
+        self.speed = speed
+        self.shape = (int(math.ceil(size[0] / resolution)) + 1,
+                      int(math.ceil(size[1] / resolution)) + 1)
+
+        self.graph = graph
+        self.nodes = graph.xz
+        self.row = lru_cache(maxsize = cache_size)(self._row)
+
+        self.no_evidence = np.ones(graph.num_nodes)
+        self.no_evidence.setflags(write = False)
+
+    def rows(self, cx, cz):
+        # Normalized likelihood rows for the cells (cx, cz), integer arrays
+        # of any shape: the nodes fall off with the Manhattan distance from
+        # the cell center.
+        x = (np.asarray(cx) + 0.5) * self.resolution
+        z = (np.asarray(cz) + 0.5) * self.resolution
+        d = np.abs(x[..., np.newaxis] - self.nodes[:, 0]) + np.abs(z[..., np.newaxis] - self.nodes[:, 1])
+
+        rows = self.speed / np.maximum(d, self.resolution / 2)
+        rows /= rows.sum(axis = -1, keepdims = True)
+
+        return rows
+
+    def _row(self, cell):
+        row = self.rows(*cell)
+        row.setflags(write = False)
+
+        return row
+
+    def cell(self, pos):
+        cx = min(max(int(pos[0] / self.resolution), 0), self.shape[0] - 1)
+        cz = min(max(int(pos[2] / self.resolution), 0), self.shape[1] - 1)
+
+        return cx, cz
+
+    def seen(self, pos):
+        # Likelihood of each node given the opponent was seen at pos.
+        if not (math.isfinite(pos[0]) and math.isfinite(pos[2])):
+            return self.no_evidence
+
+        return self.row(self.cell(pos))
+
+    def unseen(self, nodes):
+        # Likelihood of each node given nothing was seen from nodes, ids in
+        # an array of any shape: nothing seen from a node rules out the node
+        # and its neighbors.
+        return (~self.graph.moves(nodes)).astype(float)
+
+    def fused(self, seen, nodes, positions):
+        # Joint likelihood for each of several targets given what a team of
+        # observers saw: seen[i, k] says whether observer i, at node id nodes[i],
+        # saw target k, at positions[k]. Returns (targets x nodes).
+        seen_rows = np.array([self.seen(pos) for pos in positions])
+        unseen_rows = self.unseen(nodes)
+
+        return np.where(seen[:, :, np.newaxis], seen_rows[np.newaxis, :, :],
+            unseen_rows[:, np.newaxis, :]).prod(axis = 0)
+
+    def fusedBatch(self, seen, nodes, positions):
+        # fused() for a batch of games at once: seen is (games x observers x
+        # targets), nodes (games x observers) and positions (games x targets
+        # x 3). Returns (games x targets x nodes).
+        positions = np.asarray(positions, dtype = float)
+        known = np.isfinite(positions[..., 0]) & np.isfinite(positions[..., 2])
+        cells = np.where(known[..., np.newaxis], positions[..., [0, 2]], 0) / self.resolution
+        cx = np.clip(cells[..., 0].astype(int), 0, self.shape[0] - 1)
+        cz = np.clip(cells[..., 1].astype(int), 0, self.shape[1] - 1)
+
+        seen_rows = np.where(known[..., np.newaxis], self.rows(cx, cz), 1.0)
+        unseen_rows = self.unseen(nodes)
+
+        return np.where(seen[..., np.newaxis], seen_rows[:, np.newaxis], unseen_rows[:, :, np.newaxis, :]).prod(axis = 1)
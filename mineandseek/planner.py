@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -
+
+# Monte Carlo lookahead for choosing the next waypoint. Opponents are drawn
+# from the current beliefs, and then everybody random-walks the graph for a
+# few hops, a batch of rollouts at a time, all in numpy. A rollout is worth
+# discount ** hop if the agent's side wins at that hop (catch for a Seeker,
+# reaching the diamond block for a Runner) and minus that if it loses. More
+# batches run until the time budget of the decision is spent, so choose()
+# takes about `budget` seconds however big the graph is.
+
+import time
+import numpy as np
+
+class Planner:
+    def __init__(self, arena, role, budget = 0.01, hops = 8, batch = 128, discount = 0.9):
+        self.arena = arena
+        self.seeker = role == 'Seeker'
+        self.budget = budget
+        self.hops = hops
+        self.batch = batch
+        self.discount = discount
+
+        # Neighbors of each node, itself first, padded with itself:
+        graph = arena.graph
+        self.degree = graph.degree + 1
+        self.moves = np.repeat(np.arange(graph.num_nodes)[:, None], self.degree.max(), axis = 1)
+        for i in range(graph.num_nodes):
+            self.moves[i, 1:self.degree[i]] = graph.neighbors(i)
+        self.goal = graph.index['0']
+
+        self.decisions = 0
+        self.rollouts = 0
+        self.last_rollouts = 0
+
+    def walk(self, nodes):
+        # One random hop from each of nodes, staying put included.
+        k = (np.random.random(nodes.shape) * self.degree[nodes]).astype(int)
+        return self.moves[nodes, k]
+
+    def rollout(self, candidates, beliefs, count):
+        # Summed value of count rollouts after moving to each candidate.
+        me = np.repeat(candidates[:, None], count, axis = 1)
+
+        cdf = np.cumsum(beliefs, axis = 1)
+        draws = np.random.random((len(beliefs), me.size)) * cdf[:, -1:]
+        opponents = np.array([np.searchsorted(c, d, side = 'right') for c, d in zip(cdf, draws)])
+        opponents = np.minimum(opponents, len(self.degree) - 1).reshape((-1,) + me.shape)
+
+        value = np.zeros(me.shape)
+        done = np.zeros(me.shape, dtype = bool)
+
+        for hop in range(self.hops):
+            if hop:
+                me = self.walk(me)
+            opponents = self.walk(opponents)
+
+            caught = (opponents == me).any(axis = 0)
+            if self.seeker:
+                won, lost = caught, (opponents == self.goal).any(axis = 0) & ~caught
+            else:
+                won, lost = (me == self.goal) & ~caught, caught
+
+            value += (won & ~done) * self.discount ** hop
+            value -= (lost & ~done) * self.discount ** hop
+            done |= won | lost
+
+        return value.sum(axis = 1)
+
+    def choose(self, going_to, beliefs, avoid = []):
+        # The best next waypoint from going_to, or None when the rollouts
+        # cannot tell the candidates apart. Staying put is left to the greedy
+        # choice; always picking it would stall the game.
+        index, vgi = self.arena.index, self.arena.vgi
+        excluded = set(index[node] for node in avoid) | {index[going_to]}
+        candidates = np.array([i for i in self.moves[index[going_to], :self.degree[index[going_to]]]
+            if i not in excluded], dtype = int)
+
+        if len(candidates) < 2:
+            return vgi[candidates[0]] if len(candidates) else None
+
+        beliefs = np.atleast_2d(beliefs)
+        total = np.zeros(len(candidates))
+        count = 0
+        deadline = time.perf_counter() + self.budget
+
+        while True:
+            total += self.rollout(candidates, beliefs, self.batch)
+            count += self.batch
+
+            if time.perf_counter() >= deadline:
+                break
+
+        self.decisions += 1
+        self.rollouts += count * len(candidates)
+        self.last_rollouts = count * len(candidates)
+
+        if total.max() - total.min() < 1e-12:
+            return None
+
+        return vgi[candidates[np.argmax(total)]]
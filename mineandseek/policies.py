@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -
+
+# The Seeker and Runner policies of agents.py over a BatchEnv's arrays: each
+# agent steers for the waypoint it is going to (turning by the yaw error,
+# walking until it is within 1.8 blocks) and on reaching it picks the next
+# one among its neighbors, weighted by the same utilities as Seeker.choose
+# and Runner.choose, for every game at once. A game at its first step
+# (after the env reset it) starts over from the env's start nodes.
+
+import numpy as np
+
+class BatchPolicy:
+    def __init__(self, env, agents, rngs = None):
+        # agents are the indices of the env's agents this policy plays.
+        # Draws for a game come from that game's generator in the env, which
+        # seeded resets reseed, unless the policy is given a generator per
+        # game of its own.
+        self.env = env
+        self.agents = np.asarray(agents)
+        self.own_rngs = rngs
+
+        arena = env.arena
+        self.graph = arena.graph
+        self.nodes = arena.graph.positions[:, [0, 2]]
+        self.dist_to_obj = arena.dist_to_obj
+
+        shape = (env.games, len(self.agents))
+        self.current = np.zeros(shape, dtype = np.intp)
+        self.going_to = np.zeros(shape, dtype = np.intp)
+        self.reset()
+
+    @property
+    def rngs(self):
+        return self.env.rngs if self.own_rngs is None else self.own_rngs
+
+    def reset(self, mask = None):
+        # Back to where the env started the agents, in all games or where mask is set.
+        games = slice(None) if mask is None else np.flatnonzero(mask)
+        self.current[games] = self.going_to[games] = self.env.start_nodes[games][:, self.agents]
+
+    def utility(self, obs):
+        # (games x nodes) utility of going to each node.
+        raise NotImplementedError
+
+    def choose(self, utility, which):
+        # Samples the next waypoint of the agents where which is set among
+        # the neighbors of where they are going, weighted by utility; with
+        # nothing to go by, they stay where they are going.
+        g, a = np.nonzero(which)
+        weights = np.where(self.graph.moves(self.going_to[g, a]), utility[g], 0)
+        cdf = np.cumsum(weights, axis = -1)
+
+        rngs = self.rngs
+        draws = np.array([rngs[game].random() for game in g]) * cdf[:, -1]
+        chosen = (cdf > draws[:, np.newaxis]).argmax(axis = -1)
+
+        return np.where(cdf[:, -1] > 0, chosen, self.going_to[g, a])
+
+    def act(self, obs):
+        # (games x agents x 2) move and turn for this policy's agents.
+        fresh = obs['time'] == 0
+        if fresh.any():
+            self.reset(fresh)
+
+        pos = obs['pos'][:, self.agents][..., [0, 2]]
+        yaw = obs['yaw'][:, self.agents]
+        target = self.nodes[self.going_to]
+
+        d = target - pos
+        turn = (-180 * np.arctan2(d[..., 0], d[..., 1]) / np.pi - yaw + 180) % 360 - 180
+        turn /= 180.0
+
+        arrived = np.abs(d).sum(axis = -1) <= 1.8
+        move = np.where(arrived, 0.0, 1.0)
+
+        arrived &= ~obs['done'][:, np.newaxis]
+        if arrived.any():
+            self.current[arrived] = self.going_to[arrived]
+            self.going_to[arrived] = self.choose(self.utility(obs), arrived)
+
+        return np.stack([move, turn], axis = -1)
+
+def _some(beliefs):
+    # Probability that some opponent is at each node.
+    return 1 - np.prod(1 - beliefs, axis = 1)
+
+class BatchSeeker(BatchPolicy):
+    def __init__(self, env, rngs = None):
+        BatchPolicy.__init__(self, env, np.arange(env.num_seekers), rngs)
+
+    def utility(self, obs):
+        return 0.9 * _some(obs['seeker_beliefs']) + 0.1 * self.dist_to_obj
+
+class BatchRunner(BatchPolicy):
+    def __init__(self, env, rngs = None):
+        BatchPolicy.__init__(self, env, np.arange(env.num_seekers, env.num_agents), rngs)
+
+    def utility(self, obs):
+        return 0.9 * (1 - _some(obs['runner_beliefs'])) + 0.1 * (1 - self.dist_to_obj)
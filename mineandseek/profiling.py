@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -
+
+# Phase-level instrumentation for the control loop. Each timed phase goes
+# into a log2 histogram of its latency and, optionally, a Chrome trace
+# (chrome://tracing or https://ui.perfetto.dev). Event counters give the
+# achieved rates. NullProfiler has the same interface and does nothing, so
+# leaving the calls in the loop costs next to nothing when profiling is off.
+
+import json
+import os
+import threading
+import time
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+class Histogram:
+    # Latencies in nanoseconds, bucketed by powers of two.
+    def __init__(self):
+        self.buckets = [0] * 64
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def add(self, ns):
+        self.buckets[max(ns, 1).bit_length() - 1] += 1
+        self.count += 1
+        self.total += ns
+        self.max = max(self.max, ns)
+        self.min = ns if self.min is None else min(self.min, ns)
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th percentile.
+        rank = q / 100.0 * self.count
+        seen = 0
+
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** (i + 1), self.max)
+
+        return self.max
+
+    def summary(self):
+        us = 1e-3
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1e-6,
+            'mean_us': self.total / self.count * us if self.count else 0.0,
+            'min_us': (self.min or 0) * us,
+            'p50_us': self.percentile(50) * us,
+            'p90_us': self.percentile(90) * us,
+            'p99_us': self.percentile(99) * us,
+            'max_us': self.max * us,
+            'histogram_us': {'<%g' % (2 ** (i + 1) * us): n for i, n in enumerate(self.buckets) if n},
+        }
+
+class Profiler:
+    def __init__(self, trace = True, max_events = 1 << 20):
+        self.histograms = {}
+        self.counters = {}
+        self.trace = trace
+        self.max_events = max_events
+        self.events = []
+        self.origin = time.perf_counter_ns()
+        self.wall_start = time.time()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def record(self, name, start, end):
+        # Agents may be timed from threads of their own.
+        with self.lock:
+            histogram = self.histograms.get(name)
+
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+
+            histogram.add(end - start)
+
+            if self.trace and len(self.events) < self.max_events:
+                self.events.append((name, start, end, threading.get_ident()))
+
+    def count(self, name, n = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def elapsed(self):
+        return (time.perf_counter_ns() - self.origin) * 1e-9
+
+    def summary(self):
+        elapsed = self.elapsed()
+
+        return {
+            'elapsed_s': elapsed,
+            'phases': {name: h.summary() for name, h in sorted(self.histograms.items())},
+            'counters': dict(self.counters),
+            'rates_hz': {name: n / elapsed for name, n in self.counters.items()} if elapsed else {},
+            'trace_events': len(self.events),
+            'trace_truncated': len(self.events) >= self.max_events,
+        }
+
+    def chromeTrace(self):
+        threads = sorted(set(tid for _, _, _, tid in self.events))
+        tids = {tid: i for i, tid in enumerate(threads)}
+
+        return {
+            'traceEvents': [{
+                'name': name, 'ph': 'X', 'pid': self.pid, 'tid': tids[tid],
+                'ts': (start - self.origin) / 1e3, 'dur': (end - start) / 1e3,
+            } for name, start, end, tid in self.events],
+            'displayTimeUnit': 'ms',
+            'otherData': {'start': self.wall_start},
+        }
+
+    def export(self, prefix):
+        # Writes <prefix>.summary.json and, when tracing, <prefix>.trace.json.
+        with open(prefix + '.summary.json', 'w') as f:
+            json.dump(self.summary(), f, indent = 2)
+
+        if self.trace:
+            with open(prefix + '.trace.json', 'w') as f:
+                json.dump(self.chromeTrace(), f)
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class NullProfiler:
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def record(self, name, start, end):
+        pass
+
+    def count(self, name, n = 1):
+        pass
+
+    def summary(self):
+        return {}
+
+    def export(self, prefix):
+        pass
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -
+
+# Compact recordings of a game. At every belief tick the Recorder copies each
+# agent's position, yaw, current and going_to nodes, last action and the belief
+# the other side holds about it into preallocated numpy arrays. Nothing is
+# written until the game is over, so recording costs the loop a few array
+# stores per tick. A recording is a directory of .npy files plus meta.json,
+# and load() memory-maps the arrays, so large sets of recordings can be
+# scanned without reading them into memory.
+
+import json
+import os
+import numpy as np
+
+FIELDS = ('time', 'pos', 'yaw', 'current', 'going_to', 'action', 'belief')
+
+def gameMeta(vgi, vg, edges, names, num_seekers, size = (30, 40)):
+    # The players and the arena, as a recording's meta.json and a game
+    # published by mineandseek.sharedstate describe them.
+    vgi = list(vgi)
+
+    return {
+        'names': list(names),
+        'num_seekers': num_seekers,
+        'vgi': vgi,
+        'nodes': [list(vg[node]) for node in vgi],
+        'edges': {node: sorted(edges[node]) for node in vgi},
+        'size': list(size),
+    }
+
+def fillAgents(row, index, seekers, runners, seeker_team, runner_team):
+    # Stores one tick of every field but the time into row, which maps each
+    # field's name to that tick's array; index maps nodes to their numbers.
+    for i, agent in enumerate(seekers + runners):
+        row['pos'][i] = agent.pos
+        row['yaw'][i] = getattr(agent, 'yaw', np.nan)
+        row['current'][i] = index[agent.current]
+        row['going_to'][i] = index[agent.going_to]
+        row['action'][i] = agent.action
+
+    # What the other side believes about each agent:
+    row['belief'][:len(seekers)] = runner_team.hmm.f
+    row['belief'][len(seekers):] = seeker_team.hmm.f
+
+class Recorder:
+    def __init__(self, path, vgi, vg, edges, names, num_seekers, capacity = 1024, size = (30, 40)):
+        self.path = path
+        self.vgi = list(vgi)
+        self.index = {node: i for i, node in enumerate(self.vgi)}
+        self.meta = gameMeta(self.vgi, vg, edges, names, num_seekers, size)
+
+        agents, nodes = len(names), len(self.vgi)
+        self.ticks = 0
+        self.arrays = {
+            'time': np.empty(capacity),
+            'pos': np.empty((capacity, agents, 3), dtype = np.float32),
+            'yaw': np.empty((capacity, agents), dtype = np.float32),
+            'current': np.empty((capacity, agents), dtype = np.int16),
+            'going_to': np.empty((capacity, agents), dtype = np.int16),
+            'action': np.empty((capacity, agents, 2), dtype = np.float32),
+            'belief': np.empty((capacity, agents, nodes), dtype = np.float32),
+        }
+
+    def grow(self):
+        for name, array in self.arrays.items():
+            bigger = np.empty((2 * len(array),) + array.shape[1:], dtype = array.dtype)
+            bigger[:len(array)] = array
+            self.arrays[name] = bigger
+
+    def record(self, t, seekers, runners, seeker_team, runner_team):
+        if self.ticks == len(self.arrays['time']):
+            self.grow()
+
+        n = self.ticks
+
+        self.arrays['time'][n] = t
+        fillAgents({name: self.arrays[name][n] for name in FIELDS[1:]}, self.index,
+            seekers, runners, seeker_team, runner_team)
+
+        self.ticks += 1
+
+    def close(self, **meta):
+        # Writes the recording out, with anything passed in as extra metadata.
+        os.makedirs(self.path, exist_ok = True)
+
+        for name in FIELDS:
+            np.save(os.path.join(self.path, name + '.npy'), self.arrays[name][:self.ticks])
+
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(dict(self.meta, ticks = self.ticks, **meta), f)
+
+class Recording:
+    # A recording on disk. The arrays are memory-mapped and only read as
+    # they are used.
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+
+        for name in FIELDS:
+            setattr(self, name, np.load(os.path.join(path, name + '.npy'), mmap_mode = 'r'))
+
+        self.names = self.meta['names']
+        self.num_seekers = self.meta['num_seekers']
+        self.vgi = self.meta['vgi']
+        self.vg = {node: tuple(pos) for node, pos in zip(self.vgi, self.meta['nodes'])}
+        self.edges = {node: set(neighbors) for node, neighbors in self.meta['edges'].items()}
+
+    def __len__(self):
+        return self.meta['ticks']
+
+def load(path):
+    return Recording(path)
+
+def find(paths):
+    # Every recording in or under the given paths, in order.
+    found = []
+
+    for path in paths:
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            found.append(path)
+        elif os.path.isdir(path):
+            found += find(sorted(os.path.join(path, name) for name in os.listdir(path)
+                if os.path.isdir(os.path.join(path, name))))
+
+    return found
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -
+
+# Retained-mode view of the waypoint graph and the Seekers' beliefs. The edges
+# and nodes are drawn once per game; each frame only recolors the nodes and
+# moves the agent markers. Tk only works from the main thread on macOS, so
+# the view never gets a thread of its own: the loop that owns the main
+# thread calls update() as it goes, which draws a frame when one is due at
+# `fps`, and one window is kept for every game.
+
+import time
+import numpy as np
+import tkinter as tk
+from .graph import Graph
+
+class GraphView:
+    def __init__(self, vgi, vg, edges, size = (30, 40), scale = 10, fps = 10):
+        self.vgi = vgi
+        self.vg = vg
+        self.edges = edges
+        self.graph = Graph(vgi, vg, edges)
+        self.size = size
+        self.scale = scale
+        self.period = 1.0 / fps
+
+        self.seekers = []
+        self.runners = []
+        self.running = False
+        self.root = None
+        self.next_frame = 0.0
+
+    def point(self, x, z):
+        return (self.size[0] - x) * self.scale, (self.size[1] - z) * self.scale
+
+    def box(self, x, z, diameter):
+        x0, z0 = self.point(x + diameter / 2, z + diameter / 2)
+        x1, z1 = self.point(x - diameter / 2, z - diameter / 2)
+
+        return x0, z0, x1, z1
+
+    def start(self, seekers, runners):
+        # Shows a new game, in the window of the last one if it is still open.
+        self.seekers = seekers
+        self.runners = runners
+
+        if self.root is None:
+            self.root = tk.Tk()
+            self.root.wm_title("Utilities")
+            self.root.protocol("WM_DELETE_WINDOW", self.close)
+            self.canvas = tk.Canvas(self.root, width = self.size[0] * self.scale,
+                height = self.size[1] * self.scale, borderwidth = 0, highlightthickness = 0, bg = "white")
+            self.canvas.grid()
+        else:
+            self.canvas.delete('all')
+
+        self.create()
+        self.running = True
+        self.next_frame = 0.0
+        self.update()
+
+    def update(self):
+        # Draws a frame and handles the window's events if a frame is due.
+        if not self.running:
+            return
+
+        now = time.time()
+        if now >= self.next_frame:
+            self.next_frame = max(self.next_frame + self.period, now)
+            self.draw()
+            self.root.update()
+
+    def stop(self):
+        # Stops drawing; the window stays up for the next game.
+        self.running = False
+
+    def destroy(self):
+        self.running = False
+
+        if self.root is not None:
+            self.root.destroy()
+            self.root = None
+
+    def close(self):
+        # The window was closed; a later game opens a new one.
+        self.destroy()
+
+    def create(self):
+        node_radius = 2
+
+        xz = self.graph.xz
+        for i, j in self.graph.edge_list:
+            if j < i:
+                self.canvas.create_line(*self.point(*xz[i]), *self.point(*xz[j]), fill = 'black')
+
+        self.nodes = [self.canvas.create_oval(*self.box(self.vg[node][0], self.vg[node][2], node_radius),
+            outline = 'black', fill = 'white', width = 1) for node in self.vgi]
+
+        self.markers = [(self.canvas.create_oval(0, 0, 0, 0, outline = 'blue', fill = 'blue'), agent)
+            for agent in self.seekers]
+        self.markers += [(self.canvas.create_oval(0, 0, 0, 0, outline = 'grey', fill = 'grey'), agent)
+            for agent in self.runners]
+
+    def draw(self):
+        belief = np.asarray(self.seekers[0].hmm.get()).ravel()
+        probabilities = np.log2(1 + belief / belief.sum()) * 255
+        highlighted = set(node for seeker in self.seekers for node in (seeker.current, seeker.going_to))
+
+        for i, node in enumerate(self.vgi):
+            color = int(probabilities[i])
+            fill = '#%02x%02x%02x' % (255, 255 - color, 255 - color)
+
+            if node in highlighted:
+                self.canvas.itemconfigure(self.nodes[i], fill = fill, outline = 'red', width = 2)
+            else:
+                self.canvas.itemconfigure(self.nodes[i], fill = fill, outline = 'black', width = 1)
+
+        for marker, agent in self.markers:
+            if np.isfinite(agent.pos[0]) and np.isfinite(agent.pos[2]):
+                self.canvas.coords(marker, *self.box(agent.pos[0], agent.pos[2], 1))
@@ -0,0 +1,134 @@
+from __future__ import print_function
+# -*- coding: utf-8 -
+
+# Replays recordings made with --record, without Minecraft:
+#
+#   python -m mineandseek.replay recordings/ --metrics metrics.json
+#   python -m mineandseek.replay recordings/episode-0003 --show --speed 4
+#
+# Metrics are computed one recording at a time from the memory-mapped
+# arrays, so a large set never has to fit in memory at once.
+
+import argparse
+import functools
+import json
+import time
+import numpy as np
+from .recording import find, load
+
+print = functools.partial(print, flush = True)
+
+def metrics(recording):
+    # How each agent moved and how well the other side tracked it.
+    nodes = np.array(recording.meta['nodes'])[:, [0, 2]]
+    pos = np.asarray(recording.pos[:, :, [0, 2]], dtype = float)
+    belief = recording.belief
+
+    known = np.isfinite(pos).all(axis = -1)
+    steps = np.linalg.norm(np.diff(pos, axis = 0), axis = -1)
+    travelled = np.where(known[1:] & known[:-1], steps, 0).sum(axis = 0)
+
+    # The waypoint each agent was closest to, and the belief placed there:
+    truth = ((pos[:, :, None, :] - nodes) ** 2).sum(axis = -1).argmin(axis = -1)
+    at_truth = np.take_along_axis(np.asarray(belief), truth[..., None], axis = -1)[..., 0]
+
+    p = np.clip(np.asarray(belief, dtype = float), 1e-12, 1)
+    entropy = -(p * np.log2(p)).sum(axis = -1)
+
+    agents = {}
+    for i, name in enumerate(recording.names):
+        seen = known[:, i]
+        agents[name] = {
+            'travelled': float(travelled[i]),
+            'belief_at_truth': float(at_truth[seen, i].mean()) if seen.any() else None,
+            'entropy_bits': float(entropy[seen, i].mean()) if seen.any() else None,
+        }
+
+    return {
+        'path': recording.path,
+        'winner': recording.meta.get('winner'),
+        'duration': recording.meta.get('duration'),
+        'ticks': len(recording),
+        'agents': agents,
+    }
+
+class Belief:
+    # Stands in for an HMM in GraphView.
+    def __init__(self):
+        self.f = None
+
+    def get(self):
+        return self.f
+
+class Replayed:
+    # Stands in for an Agent in GraphView.
+    def __init__(self, hmm):
+        self.pos = (float("inf"), float("inf"), float("inf"))
+        self.current = self.going_to = '0'
+        self.hmm = hmm
+
+def show(recording, speed = 1.0, fps = 30):
+    # Plays a recording back in GraphView at `speed` times real time.
+    from .render import GraphView
+
+    num_seekers = recording.num_seekers
+    hmm = Belief()
+    seekers = [Replayed(hmm) for x in range(num_seekers)]
+    runners = [Replayed(Belief()) for x in range(len(recording.names) - num_seekers)]
+    vgi = recording.vgi
+
+    view = GraphView(vgi, recording.vg, recording.edges, recording.meta.get('size', (30, 40)), fps = fps)
+
+    start = time.time()
+    for t in range(len(recording)):
+        # The Seekers' belief that some Runner is at each node:
+        hmm.f = 1 - np.prod(1 - recording.belief[t, num_seekers:], axis = 0, keepdims = True)
+
+        for i, agent in enumerate(seekers + runners):
+            agent.pos = tuple(recording.pos[t, i])
+            agent.current = vgi[recording.current[t, i]]
+            agent.going_to = vgi[recording.going_to[t, i]]
+
+        if t == 0:
+            view.start(seekers, runners)
+
+        wait = (recording.time[t] - recording.time[0]) / speed - (time.time() - start)
+        if wait > 0:
+            time.sleep(wait)
+
+        view.update()
+        if not view.running:
+            break
+
+    view.destroy()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Replay recorded games or compute their metrics.')
+    parser.add_argument('paths', nargs = '+', help = 'Recordings, or directories holding them.')
+    parser.add_argument('--metrics', default = '', help = 'Write per-game metrics to this JSON file.')
+    parser.add_argument('--show', action = 'store_true', help = 'Play the recordings back in the belief view.')
+    parser.add_argument('--speed', type = float, default = 1.0, help = 'Playback speed, as a multiple of real time.')
+    args = parser.parse_args(argv)
+
+    results = []
+    for path in find(args.paths):
+        recording = load(path)
+
+        if args.show:
+            show(recording, args.speed)
+
+        result = metrics(recording)
+        results.append(result)
+
+        print("%s: %s in %.1f s, %d ticks" % (path, (result['winner'] or 'Nobody') + ' wins',
+            result['duration'] or 0, result['ticks']))
+
+    if args.metrics:
+        with open(args.metrics, 'w') as f:
+            json.dump(results, f, indent = 2)
+        print("Metrics written to", args.metrics)
+
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+from __future__ import print_function
+# -*- coding: utf-8 -
+
+# Publishes the game state to shared memory for other processes to read at
+# their own rate:
+#
+#   python seek.py --simulate --publish mineandseek
+#   python -m mineandseek.sharedstate mineandseek --show
+#
+# The block holds a header, a ring of `slots` records and the arena as JSON,
+# as in a recording's meta.json. A record holds what a recording keeps for a
+# tick: the time, each agent's position, yaw, current and going_to nodes and
+# last action, and the belief the other side holds about it.
+# The publisher fills a staged record of its own and copies it into the
+# next slot with one array copy, between making the slot's counter odd and
+# making it even again, so it never waits for anybody. A reader copies a
+# slot out and keeps the copy only if the counter was even and unchanged
+# around it. The publisher always writes the slot after the newest one, so a
+# reader that keeps up is rarely turned away, and one that falls behind
+# skips records rather than holding up the game.
+
+import argparse
+import functools
+import json
+import time
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+from .recording import fillAgents, gameMeta
+
+print = functools.partial(print, flush = True)
+
+MAGIC = 0x4d534b31      # "MSK1"
+HEADER = 8              # int64s: magic, agents, nodes, slots, published, meta bytes and two spare.
+PUBLISHED = 4
+
+def recordType(num_agents, num_nodes):
+    return np.dtype([
+        ('time', np.float64),
+        ('pos', np.float64, (num_agents, 3)),
+        ('yaw', np.float64, (num_agents,)),
+        ('current', np.int32, (num_agents,)),
+        ('going_to', np.int32, (num_agents,)),
+        ('action', np.float64, (num_agents, 2)),
+        ('belief', np.float64, (num_agents, num_nodes)),
+    ])
+
+class _Block:
+    # Numpy views of a block's header, slot counters and records.
+    def attach(self, shm, num_agents, num_nodes, slots):
+        self.shm = shm
+        self.dtype = recordType(num_agents, num_nodes)
+        self.slots = slots
+
+        offset = HEADER * 8
+        self.header = np.ndarray((HEADER,), np.int64, shm.buf)
+        self.seqs = np.ndarray((slots,), np.int64, shm.buf, offset)
+        offset += slots * 8
+        self.records = np.ndarray((slots,), self.dtype, shm.buf, offset)
+        self.meta_offset = offset + slots * self.dtype.itemsize
+
+        # Records as bytes, so that each one moves in one plain copy:
+        self.raw = self.records.view(np.uint8).reshape(slots, self.dtype.itemsize)
+
+    def published(self):
+        return int(self.header[PUBLISHED])
+
+    def release(self):
+        # The views have to go before the block can be closed.
+        self.header = self.seqs = self.records = self.raw = None
+        self.shm.close()
+
+class StatePublisher(_Block):
+    def __init__(self, name, vgi, vg, edges, names, num_seekers, size = (30, 40), slots = 8):
+        self.vgi = list(vgi)
+        self.index = {node: i for i, node in enumerate(self.vgi)}
+        self.meta = gameMeta(self.vgi, vg, edges, names, num_seekers, size)
+        meta = json.dumps(self.meta).encode()
+
+        agents, nodes = len(names), len(self.vgi)
+        length = HEADER * 8 + slots * 8 + slots * recordType(agents, nodes).itemsize + len(meta)
+
+        try:
+            shm = shared_memory.SharedMemory(name, create = True, size = length)
+        except FileExistsError:
+            # Left behind by a publisher that never got to close it:
+            print('Replacing the stale shared memory block %s.' % name)
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name, create = True, size = length)
+
+        self.attach(shm, agents, nodes, slots)
+        self.name = self.shm.name
+
+        self.seqs[:] = 0
+        self.shm.buf[self.meta_offset:self.meta_offset + len(meta)] = meta
+        self.header[:] = [MAGIC, agents, nodes, slots, 0, len(meta), 0, 0]
+
+        self.staged = np.zeros(1, self.dtype)
+        self.staged_raw = self.staged.view(np.uint8)
+
+    def publish(self, t, seekers, runners, seeker_team, runner_team):
+        s = self.staged[0]
+
+        s['time'] = t
+        fillAgents(s, self.index, seekers, runners, seeker_team, runner_team)
+
+        n = self.published()
+        slot = n % self.slots
+
+        self.seqs[slot] += 1            # Odd: being written.
+        self.raw[slot] = self.staged_raw
+        self.seqs[slot] += 1            # Even: whole again.
+        self.header[PUBLISHED] = n + 1
+
+    def close(self):
+        self.release()
+        self.shm.unlink()
+
+class StateReader(_Block):
+    def __init__(self, name):
+        shm = shared_memory.SharedMemory(name)
+
+        # Before Python 3.13 the resource tracker removes every block a
+        # process opened when it exits, although the publisher owns this one.
+        # It knows blocks by their POSIX names, which start with a slash:
+        resource_tracker.unregister('/' + shm.name, 'shared_memory')
+
+        header = np.ndarray((HEADER,), np.int64, shm.buf).copy()
+        if header[0] != MAGIC:
+            shm.close()
+            raise ValueError('%s is not a published game.' % name)
+
+        agents, nodes, slots, published, meta_size = (int(h) for h in header[1:6])
+        self.attach(shm, agents, nodes, slots)
+
+        self.meta = json.loads(bytes(shm.buf[self.meta_offset:self.meta_offset + meta_size]).decode())
+        self.names = self.meta['names']
+        self.num_seekers = self.meta['num_seekers']
+        self.vgi = self.meta['vgi']
+        self.vg = {node: tuple(pos) for node, pos in zip(self.vgi, self.meta['nodes'])}
+        self.edges = {node: set(neighbors) for node, neighbors in self.meta['edges'].items()}
+
+        self.copy = np.zeros(1, self.dtype)
+        self.copy_raw = self.copy.view(np.uint8)
+
+    def get(self, n, tries = 3):
+        # A copy of record n (counting from 0), or None if it is not out
+        # yet, has been written over or kept changing while being copied.
+        slot = n % self.slots
+
+        for attempt in range(tries):
+            if not n < self.published() <= n + self.slots:
+                return None
+
+            before = self.seqs[slot]
+            self.copy_raw[:] = self.raw[slot]
+
+            if before % 2 == 0 and self.seqs[slot] == before:
+                return self.copy[0].copy()
+
+        return None
+
+    def latest(self):
+        # The newest record and its number, or (None, -1) before the first.
+        while True:
+            n = self.published() - 1
+            if n < 0:
+                return None, -1
+
+            record = self.get(n)
+            if record is not None:
+                return record, n
+
+    def close(self):
+        self.release()
+
+def follow(reader, rate = 10.0, show = False, fps = 10):
+    # Reads the newest record rate times a second until interrupted or the
+    # view is closed, reporting every second how many records it read and
+    # how many came and went in between.
+    if show:
+        from .render import GraphView
+        from .replay import Belief, Replayed
+
+        hmm = Belief()
+        seekers = [Replayed(hmm) for x in range(reader.num_seekers)]
+        runners = [Replayed(Belief()) for x in range(len(reader.names) - reader.num_seekers)]
+        view = GraphView(reader.vgi, reader.vg, reader.edges, reader.meta['size'], fps = fps)
+
+    last = reader.published() - 1
+    record = None
+    read = skipped = 0
+    report = time.time() + 1
+
+    try:
+        while True:
+            newest, n = reader.latest()
+
+            if n > last:
+                skipped += n - last - 1
+                read += 1
+                last, record = n, newest
+
+                if show:
+                    # The Seekers' belief that some Runner is at each node:
+                    hmm.f = 1 - np.prod(1 - record['belief'][reader.num_seekers:], axis = 0, keepdims = True)
+
+                    for i, agent in enumerate(seekers + runners):
+                        agent.pos = tuple(record['pos'][i])
+                        agent.current = reader.vgi[record['current'][i]]
+                        agent.going_to = reader.vgi[record['going_to'][i]]
+
+                    if read == 1:
+                        view.start(seekers, runners)
+
+            if time.time() >= report:
+                print("%d read, %d skipped, game time %.1f s" % (read, skipped,
+                    record['time'] if record is not None else 0.0))
+                report += 1
+
+            if show and read:
+                view.update()
+                if not view.running:
+                    break
+
+            time.sleep(1.0 / rate)
+    except KeyboardInterrupt:
+        pass
+
+    if show:
+        view.destroy()
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Follow a game published with --publish.')
+    parser.add_argument('name', help = 'Name of the shared memory block.')
+    parser.add_argument('--rate', type = float, default = 10.0, help = 'Reads per second.')
+    parser.add_argument('--show', action = 'store_true', help = 'Show the published beliefs as mineandseek.replay does.')
+    parser.add_argument('--fps', type = int, default = 10, help = 'Frame cap of the view.')
+    args = parser.parse_args(argv)
+
+    reader = StateReader(args.name)
+    try:
+        follow(reader, args.rate, args.show, args.fps)
+    finally:
+        reader.close()
+
+if __name__ == '__main__':
+    main()
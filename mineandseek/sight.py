@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -
+
+# Line of sight between continuous positions, answered by DDA ray marching
+# (Amanatides & Woo) through the (x, z) occupancy grid of the arena walls.
+# Rays run between cell centers and the answer is memoized per unordered
+# cell pair, so the 20 Hz checks for many agents are mostly dictionary hits.
+# visibleMany() answers many pairs at once from a dense table of cell pairs,
+# filled in as pairs come up, for arenas small enough to have one.
+
+import math
+import numpy as np
+
+# Largest grid (in cells) that gets a dense table of cell pairs:
+TABLE_CELLS = 4096
+
+class LineOfSight:
+    def __init__(self, occupancy, origin, max_entries = 1 << 20):
+        self.occupancy = np.asarray(occupancy, dtype = bool)
+        self.origin = (int(origin[0]), int(origin[1]))
+        self.max_entries = max_entries
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+
+        # Cell pair -> 1 visible, 0 not, -1 not known yet; made when first needed:
+        self.table = None
+
+        # Plain nested lists are faster than numpy for single-cell lookups:
+        self.solid = self.occupancy.tolist()
+
+    def cell(self, pos):
+        return int(math.floor(pos[0])), int(math.floor(pos[2]))
+
+    def blocked(self, cx, cz):
+        i, j = cx - self.origin[0], cz - self.origin[1]
+
+        return 0 <= i < len(self.solid) and 0 <= j < len(self.solid[i]) and self.solid[i][j]
+
+    def visible(self, a, b):
+        # Whether a and b, (x, y, z) positions, can see each other.
+        if not all(math.isfinite(c) for c in (a[0], a[2], b[0], b[2])):
+            return False
+
+        ca, cb = self.cell(a), self.cell(b)
+        key = (ca, cb) if ca <= cb else (cb, ca)
+
+        result = self.memo.get(key)
+
+        if result is None:
+            self.misses += 1
+
+            if len(self.memo) >= self.max_entries:
+                self.memo.clear()
+
+            result = self.memo[key] = self.march(*key)
+        else:
+            self.hits += 1
+
+        return result
+
+    def visibleMany(self, a, b):
+        # visible() for each pair of rows of the (n x 3) positions a and b.
+        a = np.asarray(a, dtype = float).reshape(-1, 3)
+        b = np.asarray(b, dtype = float).reshape(-1, 3)
+        shape = self.occupancy.shape
+
+        finite = np.isfinite(a[:, [0, 2]]).all(axis = 1) & np.isfinite(b[:, [0, 2]]).all(axis = 1)
+        ca = np.floor(np.where(finite[:, None], a[:, [0, 2]], 0)).astype(np.intp) - self.origin
+        cb = np.floor(np.where(finite[:, None], b[:, [0, 2]], 0)).astype(np.intp) - self.origin
+        inside = ((ca >= 0) & (ca < shape) & (cb >= 0) & (cb < shape)).all(axis = 1)
+
+        if shape[0] * shape[1] > TABLE_CELLS or not inside.all():
+            return np.array([self.visible(p, q) for p, q in zip(a, b)], dtype = bool)
+
+        if self.table is None:
+            self.table = np.full((shape[0] * shape[1],) * 2, -1, dtype = np.int8)
+
+        ka = ca[:, 0] * shape[1] + ca[:, 1]
+        kb = cb[:, 0] * shape[1] + cb[:, 1]
+        result = self.table[ka, kb]
+
+        # The same answers as visible(), which marches each pair one way only:
+        for i in np.flatnonzero(result < 0):
+            visible = self.visible(a[i], b[i])
+            self.table[ka[i], kb[i]] = self.table[kb[i], ka[i]] = visible
+            result[i] = visible
+
+        return (result > 0) & finite
+
+    def march(self, ca, cb):
+        x, z = ca
+        dx, dz = cb[0] - ca[0], cb[1] - ca[1]
+        step_x = 1 if dx > 0 else -1
+        step_z = 1 if dz > 0 else -1
+
+        # Parametric distance along the ray to the next cell boundary, and
+        # between boundaries, on each axis (from the center of ca):
+        t_delta_x = abs(1.0 / dx) if dx else float('inf')
+        t_delta_z = abs(1.0 / dz) if dz else float('inf')
+        t_x = 0.5 * t_delta_x
+        t_z = 0.5 * t_delta_z
+
+        while (x, z) != cb:
+            if self.blocked(x, z):
+                return False
+
+            if t_x < t_z:
+                x += step_x
+                t_x += t_delta_x
+            elif t_z < t_x:
+                z += step_z
+                t_z += t_delta_z
+            else:
+                # Passing exactly through a corner; sight is blocked if
+                # either of the two cells beside it is.
+                if self.blocked(x + step_x, z) or self.blocked(x, z + step_z):
+                    return False
+
+                x += step_x
+                z += step_z
+                t_x += t_delta_x
+                t_z += t_delta_z
+
+        return not self.blocked(x, z)
@@ -0,0 +1,515 @@
+from __future__ import print_function
+# -*- coding: utf-8 -
+
+# Headless stand-in for the parts of MalmoPython the game uses. It runs a
+# kinematic model of the mission described by the XML (flat floor, walls from
+# the DrawingDecorator, ContinuousMovementCommands) and steps it as fast as the
+# agents poll it, so no Minecraft client is needed. With setRealTime(True) it
+# ticks with the wall clock instead, like Minecraft, and may be polled from
+# several threads.
+
+import argparse
+import json
+import math
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from .clock import TICK_SECONDS
+from .mapcompiler import AGENT_HEIGHT, AGENT_RADIUS, FLOOR, NS, voxelize
+
+WALK_SPEED = 4.317      # Blocks per second at "move 1".
+PITCH_SPEED = 180.0     # Degrees per second at "pitch 1".
+MAX_LIFE = 20.0
+
+TimestampedString = namedtuple('TimestampedString', 'timestamp, text')
+TimestampedError = namedtuple('TimestampedError', 'timestamp, text')
+
+class MissionErrorCode:
+    MISSION_BAD_ROLE_REQUEST = 0
+    MISSION_BAD_VIDEO_REQUEST = 1
+    MISSION_ALREADY_RUNNING = 2
+    MISSION_INSUFFICIENT_CLIENTS_AVAILABLE = 3
+    MISSION_TRANSMISSION_ERROR = 4
+    MISSION_SERVER_WARMING_UP = 5
+    MISSION_SERVER_NOT_FOUND = 6
+    MISSION_NO_COMMAND_PORT = 7
+    MISSION_BAD_INSTALLATION = 8
+    MISSION_CAN_NOT_KILL_BUSY_CLIENT = 9
+    MISSION_CAN_NOT_KILL_IRREPLACEABLE_CLIENT = 10
+
+class MissionErrorDetails:
+    def __init__(self, errorCode, message):
+        self.errorCode = errorCode
+        self.message = message
+
+class MissionException(Exception):
+    def __init__(self, errorCode, message):
+        Exception.__init__(self, message)
+        self.details = MissionErrorDetails(errorCode, message)
+        self.message = message
+
+class RewardsPolicy:
+    LATEST_REWARD_ONLY = 0
+    SUM_REWARDS = 1
+    KEEP_ALL_REWARDS = 2
+
+class ObservationsPolicy:
+    LATEST_OBSERVATION_ONLY = 0
+    KEEP_ALL_OBSERVATIONS = 1
+
+class TimestampedReward:
+    def __init__(self, timestamp, value):
+        self.timestamp = timestamp
+        self.value = value
+
+    def getValue(self, dimension = 0):
+        return self.value
+
+class ClientInfo:
+    def __init__(self, ip_address = '127.0.0.1', control_port = 10000, command_port = 0):
+        self.ip_address = ip_address
+        self.control_port = control_port
+        self.command_port = command_port
+
+class ClientPool:
+    def __init__(self):
+        self.clients = []
+
+    def add(self, client_info):
+        self.clients.append(client_info)
+
+class MissionSpec:
+    def __init__(self, xml = None, validate = True):
+        self.xml = xml
+
+    def getAsXML(self, prettyPrint = False):
+        return self.xml
+
+class MissionRecordSpec:
+    def __init__(self, destination = ''):
+        self.destination = destination
+
+class WorldState:
+    def __init__(self, has_mission_begun = False, is_mission_running = False,
+            observations = (), rewards = (), errors = (), observation_count = None):
+        self.has_mission_begun = has_mission_begun
+        self.is_mission_running = is_mission_running
+        self.observations = list(observations)
+        self.rewards = list(rewards)
+        self.errors = list(errors)
+        self.video_frames = []
+        self.mission_control_messages = []
+        # Counts every observation received, even those the policy dropped:
+        self.number_of_observations_since_last_state = len(self.observations) \
+            if observation_count is None else observation_count
+        self.number_of_rewards_since_last_state = len(self.rewards)
+        self.number_of_video_frames_since_last_state = 0
+
+class _SimAgent:
+    def __init__(self, role, section, turn_speed):
+        self.role = role
+        self.name = section.findtext(NS + 'Name')
+
+        placement = section.find('.//' + NS + 'Placement')
+        self.x = float(placement.get('x'))
+        self.y = float(placement.get('y'))
+        self.z = float(placement.get('z'))
+        self.yaw = float(placement.get('yaw', 0))
+        self.pitch = float(placement.get('pitch', 0))
+
+        self.move = 0.0
+        self.turn = 0.0
+        self.pitch_rate = 0.0
+        self.turn_speed = turn_speed
+        self.distance_travelled = 0.0
+        self.life = MAX_LIFE
+
+        items = [item.get('type') for item in section.iter(NS + 'InventoryItem')]
+        self.has_diamond = 'diamond' in items
+
+        handlers = section.find(NS + 'AgentHandlers')
+        self.catch_reward = self.itemReward(handlers, 'RewardForCollectingItem')
+        self.lose_reward = self.itemReward(handlers, 'RewardForDiscardingItem')
+        self.catches = handlers.find(NS + 'AgentQuitFromCollectingItem') is not None
+        self.can_quit = handlers.find(NS + 'MissionQuitCommands') is not None
+        self.quit = False
+
+        entities = handlers.find('.//' + NS + 'ObservationFromNearbyEntities/' + NS + 'Range')
+        self.entity_range = None if entities is None else (
+            entities.get('name'), float(entities.get('xrange')),
+            float(entities.get('yrange')), float(entities.get('zrange')))
+
+    @staticmethod
+    def itemReward(handlers, tag):
+        for item in handlers.findall(NS + tag + '/' + NS + 'Item'):
+            if item.get('type') == 'diamond':
+                return float(item.get('reward'))
+
+        return 0.0
+
+    def command(self, text):
+        parts = text.split()
+
+        if parts == ['quit']:
+            self.quit = self.can_quit
+            return
+
+        if len(parts) != 2:
+            return
+
+        verb, value = parts
+
+        try:
+            value = max(-1.0, min(1.0, float(value)))
+        except ValueError:
+            return
+
+        if verb == 'move':
+            self.move = value
+        elif verb == 'turn':
+            self.turn = value
+        elif verb == 'pitch':
+            self.pitch_rate = value
+
+class _Mission:
+    def __init__(self, mission_xml, exp_id):
+        self.exp_id = exp_id
+        root = ET.fromstring(mission_xml)
+
+        # A tick is always 1/20 s of game time; MsPerTick only sets how much
+        # wall time it takes, which matters in real-time mode.
+        ms_per_tick = root.findtext('.//' + NS + 'MsPerTick')
+        self.dt = TICK_SECONDS
+        self.wall_dt = (float(ms_per_tick) if ms_per_tick else 50.0) / 1000.0
+
+        time_up = root.find('.//' + NS + 'ServerQuitFromTimeUp')
+        self.time_limit = None if time_up is None else float(time_up.get('timeLimitMs')) / 1000.0
+
+        self.agents = []
+        for role, section in enumerate(root.findall(NS + 'AgentSection')):
+            movement = section.find('.//' + NS + 'ContinuousMovementCommands')
+            turn_speed = 180.0 if movement is None else float(movement.get('turnSpeedDegs', 180))
+            self.agents.append(_SimAgent(role, section, turn_speed))
+
+        voxels = voxelize(mission_xml)
+        self.solid, self.origin = voxels.layers(FLOOR, FLOOR + AGENT_HEIGHT)
+
+        goal = voxels.find('diamond_block')
+        self.goal = (goal[0][0] + 0.5, goal[0][2] + 0.5) if len(goal) else None
+
+        # Agents stand on the floor, not at their spawn height:
+        for agent in self.agents:
+            agent.y = float(FLOOR)
+
+        self.hosts = {}
+        self.ticks = 0
+        self.wall_start = None
+        self.running = False
+        self.ended = False
+
+    @property
+    def time(self):
+        return self.ticks * self.dt
+
+    def join(self, role, host):
+        self.hosts[role] = host
+
+        if len(self.hosts) == len(self.agents):
+            self.running = True
+            self.wall_start = time.time()
+
+            for r, h in self.hosts.items():
+                h._observe(self, self.agents[r])
+
+    def blocked(self, x, z):
+        r = AGENT_RADIUS
+        for cx in (int(math.floor(x - r)), int(math.floor(x + r))):
+            for cz in (int(math.floor(z - r)), int(math.floor(z + r))):
+                i, j = cx - self.origin[0], cz - self.origin[1]
+
+                if 0 <= i < self.solid.shape[0] and 0 <= j < self.solid.shape[1] and self.solid[i, j]:
+                    return True
+
+        return False
+
+    def advance(self):
+        # Real-time mode: catch up with the ticks the wall clock says are due.
+        due = int((time.time() - self.wall_start) / self.wall_dt) if self.running else 0
+
+        while self.running and self.ticks < due:
+            self.step()
+
+    def step(self):
+        if not self.running:
+            return
+
+        dt = self.dt
+        self.ticks += 1
+
+        for agent in self.agents:
+            agent.yaw += agent.turn * agent.turn_speed * dt
+            agent.yaw = (agent.yaw + 180.0) % 360.0 - 180.0
+            agent.pitch = max(-90.0, min(90.0, agent.pitch + agent.pitch_rate * PITCH_SPEED * dt))
+
+            speed = agent.move * WALK_SPEED * dt
+            rad = math.radians(agent.yaw)
+            nx = agent.x - math.sin(rad) * speed
+            nz = agent.z + math.cos(rad) * speed
+
+            # Slide along walls one axis at a time:
+            if not self.blocked(nx, agent.z):
+                agent.distance_travelled += abs(nx - agent.x)
+                agent.x = nx
+            if not self.blocked(agent.x, nz):
+                agent.distance_travelled += abs(nz - agent.z)
+                agent.z = nz
+
+        rewards = {}
+        for carrier in self.agents:
+            if not carrier.has_diamond:
+                continue
+
+            for catcher in self.agents:
+                if catcher.catches and abs(catcher.x - carrier.x) + abs(catcher.z - carrier.z) < 1:
+                    carrier.has_diamond = False
+                    carrier.life = 0.0
+                    rewards[catcher.role] = rewards.get(catcher.role, 0.0) + catcher.catch_reward
+                    rewards[carrier.role] = rewards.get(carrier.role, 0.0) + carrier.lose_reward
+                    self.ended = True
+                    break
+
+            if self.goal is not None and carrier.has_diamond and \
+                    abs(carrier.x - self.goal[0]) + abs(carrier.z - self.goal[1]) < 1:
+                self.ended = True
+
+        if self.time_limit is not None and self.time >= self.time_limit:
+            self.ended = True
+
+        # Every mission ends with ServerQuitWhenAnyAgentFinishes, so one quit is enough:
+        if any(agent.quit for agent in self.agents):
+            self.ended = True
+
+        for role, host in self.hosts.items():
+            host._observe(self, self.agents[role], rewards.get(role))
+
+        if self.ended:
+            self.running = False
+            _missions.pop(self.exp_id, None)
+
+    def observation(self, agent):
+        obs = {
+            'DistanceTravelled': int(agent.distance_travelled * 100),
+            'TimeAlive': self.ticks,
+            'MobsKilled': 0,
+            'PlayersKilled': 0,
+            'DamageTaken': 0,
+            'DamageDealt': 0,
+            'Life': agent.life,
+            'Score': 0,
+            'Food': 20,
+            'XP': 0,
+            'IsAlive': agent.life > 0,
+            'Air': 300,
+            'Name': agent.name,
+            'XPos': agent.x,
+            'YPos': agent.y,
+            'ZPos': agent.z,
+            'Pitch': agent.pitch,
+            'Yaw': agent.yaw,
+            'WorldTime': 12000,
+            'TotalTime': self.ticks,
+        }
+
+        if agent.entity_range is not None:
+            name, xr, yr, zr = agent.entity_range
+            obs[name] = [{
+                'yaw': other.yaw, 'x': other.x, 'y': other.y, 'z': other.z,
+                'pitch': other.pitch, 'id': str(other.role), 'motionX': 0.0,
+                'motionY': 0.0, 'motionZ': 0.0, 'life': other.life, 'name': other.name
+            } for other in self.agents
+                if abs(other.x - agent.x) <= xr and abs(other.y - agent.y) <= yr
+                    and abs(other.z - agent.z) <= zr]
+
+        return json.dumps(obs)
+
+# Missions waiting for or running with their agents, keyed by experiment id:
+_missions = {}
+
+# Hosts may be polled from several threads; they all share the missions.
+_lock = threading.RLock()
+_real_time = False
+
+def setRealTime(enabled = True):
+    # Simulator only: tick missions with the wall clock, MsPerTick apart,
+    # instead of once each time role 0 polls.
+    global _real_time
+    _real_time = enabled
+
+class _ArgumentParser(argparse.ArgumentParser):
+    def error(self, message):
+        raise RuntimeError(message)
+
+class AgentHost:
+    def __init__(self):
+        self._parser = _ArgumentParser(add_help = False)
+        self._args = None
+        self._defaults = {}
+        self.addOptionalFlag('help,h', 'show description of allowed options')
+
+        self._mission = None
+        self._role = None
+        self._observations = []
+        self._observation_count = 0
+        self._rewards = []
+        self._begun = False
+        self._running = False
+        self._rewards_policy = RewardsPolicy.SUM_REWARDS
+        self._observations_policy = ObservationsPolicy.LATEST_OBSERVATION_ONLY
+
+    # Command-line parsing, mirroring Malmo's ArgumentParser:
+
+    def _add(self, name, **kwargs):
+        names = name.split(',')
+        flags = ['--' + names[0]] + ['-' + n for n in names[1:]]
+        self._parser.add_argument(*flags, dest = names[0], **kwargs)
+
+    def addOptionalFlag(self, name, description):
+        self._add(name, action = 'store_true', help = description)
+
+    def addOptionalIntArgument(self, name, description, default):
+        self._add(name, type = int, default = default, help = description)
+
+    def addOptionalFloatArgument(self, name, description, default):
+        self._add(name, type = float, default = default, help = description)
+
+    def addOptionalStringArgument(self, name, description, default):
+        self._add(name, type = str, default = default, help = description)
+
+    def parse(self, args):
+        self._args = self._parser.parse_args(list(args)[1:])
+
+    def receivedArgument(self, name):
+        value = getattr(self._args, name, None)
+        return value is not None and value is not False
+
+    def getIntArgument(self, name):
+        return int(getattr(self._args, name))
+
+    def getFloatArgument(self, name):
+        return float(getattr(self._args, name))
+
+    def getStringArgument(self, name):
+        return str(getattr(self._args, name))
+
+    def getUsage(self):
+        return self._parser.format_help()
+
+    # Mission control:
+
+    def setDebugOutput(self, debug):
+        pass
+
+    def setRewardsPolicy(self, policy):
+        self._rewards_policy = policy
+
+    def setObservationsPolicy(self, policy):
+        self._observations_policy = policy
+
+    def setVideoPolicy(self, policy):
+        pass
+
+    def startMission(self, mission, client_pool, mission_record = None, role = 0, expId = ''):
+        with _lock:
+            self._startMission(mission, client_pool, mission_record, role, expId)
+
+    def _startMission(self, mission, client_pool, mission_record, role, expId):
+        if self._running:
+            raise MissionException(MissionErrorCode.MISSION_ALREADY_RUNNING,
+                'A mission is already running.')
+
+        if role == 0:
+            sim = _Mission(mission.getAsXML(False), expId)
+
+            if len(client_pool.clients) < len(sim.agents):
+                raise MissionException(MissionErrorCode.MISSION_INSUFFICIENT_CLIENTS_AVAILABLE,
+                    'Not enough clients in the client pool.')
+
+            _missions[expId] = sim
+        elif expId not in _missions:
+            raise MissionException(MissionErrorCode.MISSION_SERVER_NOT_FOUND,
+                'Failed to find the server for this mission.')
+
+        sim = _missions[expId]
+
+        if role < 0 or role >= len(sim.agents) or role in sim.hosts:
+            raise MissionException(MissionErrorCode.MISSION_BAD_ROLE_REQUEST,
+                'Role %d is not available in this mission.' % role)
+
+        self._mission = sim
+        self._role = role
+        self._observations = []
+        self._observation_count = 0
+        self._rewards = []
+        self._begun = False
+        self._running = True
+
+        sim.join(role, self)
+
+    def _observe(self, sim, agent, reward = None):
+        self._begun = True
+        text = sim.observation(agent)
+        self._observation_count += 1
+
+        if self._observations_policy == ObservationsPolicy.LATEST_OBSERVATION_ONLY:
+            self._observations = [TimestampedString(sim.time, text)]
+        else:
+            self._observations.append(TimestampedString(sim.time, text))
+
+        if reward is not None:
+            if self._rewards_policy == RewardsPolicy.KEEP_ALL_REWARDS or not self._rewards:
+                self._rewards.append(TimestampedReward(sim.time, reward))
+            elif self._rewards_policy == RewardsPolicy.SUM_REWARDS:
+                self._rewards[-1] = TimestampedReward(sim.time, self._rewards[-1].value + reward)
+            else:
+                self._rewards = [TimestampedReward(sim.time, reward)]
+
+        if sim.ended:
+            self._running = False
+
+    def _state(self):
+        return WorldState(self._begun, self._running and self._begun,
+            self._observations, self._rewards, observation_count = self._observation_count)
+
+    def peekWorldState(self):
+        with _lock:
+            if _real_time and self._mission is not None:
+                self._mission.advance()
+
+            return self._state()
+
+    def getWorldState(self):
+        # The mission advances one tick each time role 0 polls it, so the
+        # simulation runs exactly as fast as the control loop, unless it
+        # keeps to the wall clock.
+        with _lock:
+            if self._mission is not None:
+                if _real_time:
+                    self._mission.advance()
+                elif self._role == 0:
+                    self._mission.step()
+
+            state = self._state()
+            self._observations = []
+            self._observation_count = 0
+            self._rewards = []
+
+            return state
+
+    def getSimulatedTime(self):
+        return 0.0 if self._mission is None else self._mission.time
+
+    def sendCommand(self, command, key = None):
+        with _lock:
+            if self._running and self._mission is not None:
+                self._mission.agents[self._role].command(command)
@@ -0,0 +1,250 @@
+from __future__ import print_function
+# -*- coding: utf-8 -
+
+# Runs many games at once: the Minecraft clients are split into pools of one
+# client per agent, and each pool is driven by a worker process of its own
+# that takes games off a shared queue until there are none left. The
+# results of every game are gathered into one JSON file.
+#
+#   python -m mineandseek.tournament --clients 127.0.0.1:10000-10007 --games 200
+#
+# With --simulate every pool plays on the headless simulator, so the
+# scheduler can be tried out without any Minecraft running.
+
+import functools
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import time
+import numpy as np
+from . import mission
+from .arena import Arena
+from .clock import TickClock
+from .generator import loadLayout, parseSize
+
+print = functools.partial(print, flush = True)
+
+def parseClients(text):
+    # "ip:port,ip:first-last,..." -> [(ip, port), ...]
+    clients = []
+
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+
+        ip, ports = item.rsplit(':', 1)
+        first, _, last = ports.partition('-')
+
+        clients += [(ip, port) for port in range(int(first), int(last or first) + 1)]
+
+    return clients
+
+def splitPools(clients, size):
+    # Consecutive clients make up a pool; any left over are not used.
+    return [clients[i:i + size] for i in range(0, len(clients) - size + 1, size)]
+
+def playPool(pool, clients, simulate, num_seekers, tasks, results, debug = False, record = '',
+        transition = '', seed = None, arena_seed = None, arena_size = (30, 40), **options):
+    # Worker process: plays the games queued in tasks on one pool of clients
+    # and puts what happened in results. A mission that cannot be started
+    # makes safeStartMission exit, which ends this worker only. Game n is
+    # seeded with seed + n, so it is the same game whichever pool plays it.
+    # With arena_seed set, the games are played on that generated arena;
+    # options go on to runEpisode.
+    # A forked worker inherits its parent's random state, so draw a new one:
+    random.seed()
+    np.random.seed()
+
+    MalmoPython = mission.loadBackend(simulate)
+
+    agent_hosts = [MalmoPython.AgentHost() for x in clients]
+    for ah in agent_hosts:
+        ah.setDebugOutput(debug)
+
+    client_pool = MalmoPython.ClientPool()
+    for ip, port in clients:
+        client_pool.add(MalmoPython.ClientInfo(ip, port))
+
+    layout = None if arena_seed is None else loadLayout(arena_seed, arena_size)
+    arena = Arena(transition_file = transition or None, layout = layout)
+
+    # The simulator plays in lockstep, as fast as it can:
+    if simulate:
+        options.update(poll_interval = 0, settle_time = 0)
+
+    first = True
+    while True:
+        game = tasks.get()
+        if game is None:
+            break
+
+        # The world is made by the pool's first game and reused by the rest:
+        result = mission.runEpisode(agent_hosts, client_pool, arena, num_seekers, TickClock(),
+            force_reset = first, keep_world = True, concurrent = not simulate,
+            record = record and os.path.join(record, 'game-%04d' % game),
+            seed = None if seed is None else seed + game, **options)
+        first = False
+
+        result['game'] = game
+        result['pool'] = pool
+        results.put(result)
+
+def summarize(games, wall_time, num_pools, results):
+    catch_times = [result['duration'] for result in results if result['winner'] == 'Seeker']
+    escape_times = [result['duration'] for result in results if result['winner'] == 'Runner']
+    played = len(results)
+
+    def stats(times):
+        if not times:
+            return None
+
+        return {'mean': float(np.mean(times)), 'median': float(np.median(times)),
+            'min': float(np.min(times)), 'max': float(np.max(times))}
+
+    return {
+        'games': games,
+        'played': played,
+        'failed': games - played,
+        'pools': num_pools,
+        'seeker_wins': len(catch_times),
+        'runner_wins': len(escape_times),
+        'draws': played - len(catch_times) - len(escape_times),
+        'seeker_win_rate': len(catch_times) / played if played else None,
+        'runner_win_rate': len(escape_times) / played if played else None,
+        'catch_time': stats(catch_times),
+        'escape_time': stats(escape_times),
+        'wall_time': wall_time,
+        'games_per_second': played / wall_time if wall_time > 0 else None,
+        'games_per_pool': [sum(result['pool'] == pool for result in results) for pool in range(num_pools)],
+    }
+
+def runTournament(clients, games, num_agents, num_seekers = 1, simulate = False, debug = False,
+        record = '', transition = '', seed = None, arena_seed = None, arena_size = (30, 40), **options):
+    # Plays games over as many pools of num_agents clients as there are,
+    # and returns the summary and the per-game results. With record set,
+    # game n is recorded to <record>/game-<n>. Options (plan_budget,
+    # ms_per_tick, entity_range) go on to runEpisode.
+    pools = splitPools(clients, num_agents)
+    if not pools:
+        raise ValueError('Need at least %d clients for one pool, got %d.' % (num_agents, len(clients)))
+
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+
+    for game in range(games):
+        tasks.put(game)
+    for pool in pools:
+        tasks.put(None)
+
+    start_time = time.time()
+
+    workers = [multiprocessing.Process(target = playPool, name = 'pool-%d' % pool,
+        args = (pool, clients, simulate, num_seekers, tasks, results, debug, record, transition, seed,
+            arena_seed, arena_size),
+        kwargs = options)
+        for pool, clients in enumerate(pools)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    # Collect until every game is in or no worker is left to play the rest:
+    played = []
+    while len(played) < games:
+        try:
+            result = results.get(timeout = 1)
+        except queue.Empty:
+            if not any(worker.is_alive() for worker in workers):
+                break
+            continue
+
+        played.append(result)
+        print("Game %d on pool %d: %s in %.1f s" % (result['game'], result['pool'],
+            (result['winner'] or 'Nobody') + ' wins', result['duration']))
+
+    wall_time = time.time() - start_time
+
+    for worker in workers:
+        worker.join(timeout = 10)
+        if worker.exitcode != 0:
+            print("Worker", worker.name, "stopped with exit code", worker.exitcode)
+
+    played.sort(key = lambda result: result['game'])
+
+    return summarize(games, wall_time, len(pools), played), played
+
+def main(argv = None):
+    argv = sys.argv if argv is None else argv
+
+    simulate = '--simulate' in argv[1:] or '-s' in argv[1:]
+    MalmoPython = mission.loadBackend(simulate)
+
+    parser = MalmoPython.AgentHost()
+    parser.addOptionalFlag("debug,d", "Display debug information.")
+    parser.addOptionalFlag("simulate,s", "Play on the headless simulator instead of Minecraft.")
+    parser.addOptionalStringArgument("clients", "Minecraft clients as ip:port or ip:first-last, comma separated.", "")
+    parser.addOptionalIntArgument("agents,n", "Number of agents in each game.", 2)
+    parser.addOptionalIntArgument("seekers", "Number of agents playing Seeker; the rest play Runner.", 1)
+    parser.addOptionalIntArgument("games", "Number of games to play.", 10)
+    parser.addOptionalIntArgument("plan", "Choose waypoints by Monte Carlo lookahead, spending this many ms per decision (0: greedy).", 0)
+    parser.addOptionalIntArgument("seed", "Seed game n with seed + n, so that games can be replayed (-1: unseeded).", -1)
+    parser.addOptionalIntArgument("ms-per-tick", "Wall-clock ms per Minecraft tick; below 50 runs faster than real time.", 50)
+    parser.addOptionalIntArgument("arena-seed", "Play on the arena mineandseek.generator makes from this seed (-1: the hand-drawn one).", -1)
+    parser.addOptionalStringArgument("arena-size", "Width x depth of a generated arena, in blocks.", "30x40")
+    parser.addOptionalIntArgument("entity-range", "How far away, in blocks, agents are told about each other.", 40)
+    parser.addOptionalStringArgument("transition", "Load the transition model from this file, as written by mineandseek.fitting.", "")
+    parser.addOptionalStringArgument("record", "Record every game to <record>/game-<n> for mineandseek.replay.", "")
+    parser.addOptionalStringArgument("results", "Write the summary and per-game results to this JSON file.", "tournament.json")
+
+    try:
+        parser.parse(argv)
+    except RuntimeError as e:
+        print('ERROR:', e)
+        print(parser.getUsage())
+        exit(1)
+    if parser.receivedArgument("help"):
+        print(parser.getUsage())
+        exit(0)
+
+    num_agents = parser.getIntArgument("agents")
+    num_seekers = parser.getIntArgument("seekers")
+
+    if num_seekers < 1 or num_agents - num_seekers < 1:
+        print('ERROR: need at least one Seeker and one Runner.')
+        print(parser.getUsage())
+        exit(1)
+
+    clients = parser.getStringArgument("clients") or '127.0.0.1:%d-%d' % (10000, 10000 + num_agents - 1)
+    clients = parseClients(clients)
+    seed = parser.getIntArgument("seed")
+    arena_seed = parser.getIntArgument("arena-seed")
+    arena_seed = arena_seed if arena_seed >= 0 else None
+    arena_size = parseSize(parser.getStringArgument("arena-size"))
+
+    # Compile the map once here, so the workers find it in the cache or bank:
+    if arena_seed is None:
+        Arena()
+    else:
+        loadLayout(arena_seed, arena_size)
+
+    summary, played = runTournament(clients, parser.getIntArgument("games"), num_agents, num_seekers,
+        simulate, parser.receivedArgument("debug"), parser.getStringArgument("record"),
+        parser.getStringArgument("transition"), seed if seed >= 0 else None, arena_seed, arena_size,
+        plan_budget = parser.getIntArgument("plan") / 1000.0, ms_per_tick = parser.getIntArgument("ms-per-tick"),
+        entity_range = parser.getIntArgument("entity-range"))
+
+    results = parser.getStringArgument("results")
+    with open(results, 'w') as f:
+        json.dump({'summary': summary, 'games': played}, f, indent = 2)
+
+    print("Seeker won %d, Runner won %d of %d games (%d failed) in %.1f s" % (summary['seeker_wins'],
+        summary['runner_wins'], summary['played'], summary['failed'], summary['wall_time']))
+    print("Results written to", results)
+
+    return summary
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -
+
+import numpy as np
+import pytest
+from mineandseek.arena import Arena
+from mineandseek.belief import BeliefEngine, SparseTransition, TransitionOperator
+
+def test_step_of_one_period_is_T():
+    arena = Arena()
+    T = arena.transitionMatrix()
+    operator = TransitionOperator(T, arena.period)
+
+    assert np.allclose(operator(arena.period), T, atol = 1e-10)
+    assert np.allclose(operator(2 * arena.period), T @ T, atol = 1e-10)
+    assert np.allclose(operator(0), np.eye(arena.num_nodes), atol = 1e-10)
+
+def test_steps_are_stochastic_and_compose_over_whole_periods():
+    arena = Arena()
+    operator = TransitionOperator(arena.transitionMatrix(), arena.period)
+
+    for s in (0.05, 0.5, 1.0, 1.37, 4.5):
+        assert operator.power(s).min() >= 0
+        assert np.allclose(operator.power(s).sum(axis = -1), 1)
+
+    # Steps whole periods apart make up the step of their sum, either way round:
+    for a, b in ((1, 0.5), (2, 0.3), (0.75, 3), (2, 3)):
+        assert np.allclose(operator.power(a) @ operator.power(b), operator.power(a + b), atol = 1e-12)
+
+def test_sparse_steps_match_dense():
+    arena = Arena()
+    operator = TransitionOperator(arena.transitionMatrix(), arena.period)
+    sparse = SparseTransition(*arena.transitionEntries(), arena.num_nodes, arena.period)
+    f = np.random.default_rng(0).dirichlet(np.ones(arena.num_nodes), 3)
+
+    for dt in (0.05, 0.1, 0.2, 0.37, 0.5):
+        assert np.allclose(sparse.propagate(f, dt), operator.propagate(f, dt))
+
+    # A long gap neither underflows nor loses mass:
+    far = sparse.propagate(f, 300.0)
+    assert np.isfinite(far).all()
+    assert np.allclose(far.sum(axis = -1), 1)
+
+def _matrixTick(f, O, T):
+    # The update BeliefEngine replaced: f = O T' f over np.matrix column
+    # vectors, with O the observation diagonal, normalised.
+    f = np.diag(O) * np.matrix(T).T * np.matrix(f).T
+    return np.asarray(f / f.sum()).ravel()
+
+@pytest.mark.filterwarnings('ignore::PendingDeprecationWarning')
+@pytest.mark.parametrize('agents', [1, 3])
+def test_tick_matches_matrix_update(agents):
+    arena = Arena()
+    T = arena.transitionMatrix()
+    engine = BeliefEngine(arena.transition(), 1, agents)
+    rng = np.random.default_rng(agents)
+
+    old = [np.full(arena.num_nodes, 1.0 / arena.num_nodes) for a in range(agents)]
+    for t in range(20):
+        # Some ticks see an opponent, the rest have no evidence:
+        O = rng.uniform(0.01, 1, (agents, arena.num_nodes)) if t % 3 else np.ones((agents, arena.num_nodes))
+
+        new = engine.tick(O[np.newaxis], arena.period)
+        old = [_matrixTick(f, o, T) for f, o in zip(old, O)]
+
+        assert np.allclose(new[0], old, atol = 1e-12)